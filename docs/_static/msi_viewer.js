@@ -1136,7 +1136,7 @@ class MSIViewer {
       try:
         table = current_package.get('${selectedTable}')
         result['columns'] = [column.name for column in table.columns]
-        result['rows'] = [row for row in table.rows]
+        result['rows'] = [dict(row) for row in table]
       except Exception as e:
         print(f"Error getting table data: {e}")
       to_js(result)
@@ -1530,7 +1530,7 @@ class MSIViewer {
       try:
         table = current_package.get('${tableName}')
         result['columns'] = [column.name for column in table.columns]
-        result['rows'] = [row for row in table.rows]
+        result['rows'] = [dict(row) for row in table]
       except Exception as e:
         print(f"Error getting table data: {e}")
       to_js(result)
@@ -13,6 +13,7 @@ from typing import List
 
 import pymsi
 from pymsi.msi.directory import Directory
+from pymsi.msi.msi import VERIFY_POLICIES
 from pymsi.thirdparty.refinery.cab import CabFolder
 
 # System Folder Properties: https://learn.microsoft.com/en-us/windows/win32/msi/property-reference#system-folder-properties
@@ -72,23 +73,40 @@ def extract_root(root: Directory, output: Path, is_root: bool = True):
         extract_root(child, output / folder_name, False)
 
 
+def load_msi(args, package, **kwargs) -> pymsi.Msi:
+    msi = pymsi.Msi(package, load_data=True, strict=args.strict, **kwargs)
+    for warning in msi.link_warnings:
+        print(f"Warning: {warning}")
+    return msi
+
+
 def run_tables(args, package):
     for k in package.ole.root.kids:
         name, is_table = pymsi.streamname.decode_unicode(k.name)
         if is_table:
-            print(f"Table: {name}")
+            table = package.tables.get(name)
+            if table is None:
+                print(f"Table: {name}")
+            else:
+                # The row count comes from the stream size; no rows are decoded.
+                try:
+                    count = len(table)
+                except ValueError:
+                    # The stream size is not a whole number of rows.
+                    count = "?"
+                print(f"Table: {name} ({count} rows)")
         else:
             print(f"Stream: {repr(name)}")
 
 
 def run_dump(args, package):
-    msi = pymsi.Msi(package, load_data=True, strict=args.strict)
+    msi = load_msi(args, package, verify=args.verify)
     msi.pretty_print()
 
 
 def run_test(args, package):
     try:
-        pymsi.Msi(package, load_data=True, strict=args.strict)
+        load_msi(args, package, verify="eager")
     except Exception as e:
         print(f"Invalid .msi file: {package.path}")
         traceback.print_exc()
@@ -129,7 +147,7 @@ def run_analyze(args, package):
 def run_extract(args, package):
     print(f"Loading MSI file: {package.path}")
 
-    msi = pymsi.Msi(package, load_data=True, strict=args.strict)
+    msi = load_msi(args, package, verify=args.verify)
 
     folders: List[CabFolder] = []
     for media in msi.medias.values():
@@ -219,15 +237,29 @@ def main():
         help="Enforce strict MSI validation (use --no-strict to relax checks). Default is True.",
     )
 
+    # Parent parser for cabinet checksum options
+    verify_parser = argparse.ArgumentParser(add_help=False)
+    verify_parser.add_argument(
+        "--verify",
+        choices=VERIFY_POLICIES,
+        default="off",
+        help=(
+            "When to check the CFDATA checksums of embedded cabinets: never (off), when a "
+            "folder is decompressed (lazy), or while loading (eager). Default is off."
+        ),
+    )
+
     # tables
     tables_parser = subparsers.add_parser(
         "tables", parents=[msi_parser], help="List all tables in the MSI file"
     )
-    tables_parser.set_defaults(func=run_tables)
+    tables_parser.set_defaults(func=run_tables, lazy=True)
 
     # dump
     dump_parser = subparsers.add_parser(
-        "dump", parents=[msi_parser, strict_parser], help="Dump the contents of the MSI file"
+        "dump",
+        parents=[msi_parser, strict_parser, verify_parser],
+        help="Dump the contents of the MSI file",
     )
     dump_parser.set_defaults(func=run_dump)
 
@@ -241,7 +273,7 @@ def main():
     suminfo_parser = subparsers.add_parser(
         "suminfo", parents=[msi_parser], help="Print summary information"
     )
-    suminfo_parser.set_defaults(func=run_suminfo)
+    suminfo_parser.set_defaults(func=run_suminfo, lazy=True)
 
     # customactions
     customactions_parser = subparsers.add_parser(
@@ -276,7 +308,7 @@ def main():
     # extract
     extract_parser = subparsers.add_parser(
         "extract",
-        parents=[msi_parser, strict_parser],
+        parents=[msi_parser, strict_parser, verify_parser],
         help="Extract files from the MSI file",
     )
     extract_parser.add_argument(
@@ -307,7 +339,9 @@ def main():
             print(f"Error: File '{args.msi_file}' not found.")
             sys.exit(1)
         strict = getattr(args, "strict", False)
-        package = pymsi.Package(args.msi_file, strict=strict)
+        # Commands that only need part of the package open it lazily.
+        lazy = getattr(args, "lazy", False)
+        package = pymsi.Package(args.msi_file, strict=strict, lazy=lazy)
         try:
             args.func(args, package)
         except KeyboardInterrupt:
@@ -9,6 +9,7 @@ from __future__ import annotations
 import base64
 import binascii
 import hashlib
+import inspect
 import re
 from collections import defaultdict
 from dataclasses import dataclass
@@ -103,6 +104,11 @@ _POWERSHELL_ENCODED_ARGUMENT = re.compile(
     r"(?:\"([^\"]+)\"|'([^']+)'|([^\s\"']+))"
 )
 
+# Columns read by _build_paths and _component_file_paths; the rest of the File and
+# Component tables is not needed for path resolution.
+_FILE_PATH_COLUMNS = ("File", "Component_", "FileName")
+_COMPONENT_PATH_COLUMNS = ("Component", "Directory_", "KeyPath")
+
 _ROOT_NAMES = {-1: "HKCU-or-HKLM", 0: "HKCR", 1: "HKCU", 2: "HKLM", 3: "HKU"}
 _REGLOCATOR_ROOT_NAMES = {0: "HKCR", 1: "HKCU", 2: "HKLM", 3: "HKU"}
 
@@ -426,9 +432,29 @@ def _table_rows(table: Any) -> List[Mapping[str, Any]]:
     return list(table)
 
 
-def _rows(package: Any, table_name: str, warnings: List[str]) -> List[Mapping[str, Any]]:
+def _accepts_columns(get: Any) -> bool:
+    """Return whether a package's ``get`` can read a column projection."""
+    try:
+        parameters = inspect.signature(get).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(
+        parameter.name == "columns" or parameter.kind is parameter.VAR_KEYWORD
+        for parameter in parameters
+    )
+
+
+def _rows(
+    package: Any,
+    table_name: str,
+    warnings: List[str],
+    columns: Optional[Sequence[str]] = None,
+) -> List[Mapping[str, Any]]:
     try:
-        table = package.get(table_name)
+        if columns is not None and _accepts_columns(package.get):
+            table = package.get(table_name, columns=columns)
+        else:
+            table = package.get(table_name)
         if table is None:
             return []
         return _table_rows(table)
@@ -1602,8 +1628,8 @@ def _analyze_custom_actions(
         for item in properties.get("MsiHiddenProperties", "").split(";")
         if item.strip()
     }
-    file_rows = _rows(package, "File", warnings)
-    component_rows = _rows(package, "Component", warnings)
+    file_rows = _rows(package, "File", warnings, _FILE_PATH_COLUMNS)
+    component_rows = _rows(package, "Component", warnings, _COMPONENT_PATH_COLUMNS)
     directory_rows = _rows(package, "Directory", warnings)
     file_paths, component_paths, directory_paths = _build_paths(
         file_rows, component_rows, directory_rows
@@ -1826,8 +1852,8 @@ def analyze_package(
         for row in _rows(package, "Property", warnings)
         if row.get("Property") is not None
     }
-    file_rows = _rows(package, "File", warnings)
-    component_rows = _rows(package, "Component", warnings)
+    file_rows = _rows(package, "File", warnings, _FILE_PATH_COLUMNS)
+    component_rows = _rows(package, "Component", warnings, _COMPONENT_PATH_COLUMNS)
     directory_rows = _rows(package, "Directory", warnings)
     file_paths, component_paths, directory_paths = _build_paths(
         file_rows, component_rows, directory_rows
@@ -0,0 +1,351 @@
+"""Read-only reader for compound files, the OLE container format of .msi files.
+
+The file is accessed through a single buffer (normally a read-only ``mmap``),
+the FAT and MiniFAT are kept as integer arrays, and stream data is returned
+as ``memoryview`` slices of that buffer.  Only streams whose sectors are not
+stored one after another need to be copied.
+
+:class:`CompoundFile` implements the parts of ``olefile.OleFileIO`` that
+pymsi uses (``openstream``, ``exists``, ``get_size``, ``root.kids`` and
+``close``), so :class:`pymsi.Package` can use either one.
+"""
+
+import array
+import io
+import mmap
+import struct
+import sys
+from typing import Dict, List, Optional, Union
+
+MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Special sector numbers in the FAT and MiniFAT.
+MAXREGSECT = 0xFFFF_FFFA
+ENDOFCHAIN = 0xFFFF_FFFE
+FREESECT = 0xFFFF_FFFF
+NOSTREAM = 0xFFFF_FFFF
+
+# Directory entry types.
+STGTY_STORAGE = 1
+STGTY_STREAM = 2
+STGTY_ROOT = 5
+
+_HEADER_SIZE = 512
+_DIRENTRY_SIZE = 128
+_NUM_HEADER_DIFAT = 109
+_U32_TYPECODE = "I" if array.array("I").itemsize == 4 else "L"
+
+
+def _u32_array(data) -> array.array:
+    values = array.array(_U32_TYPECODE)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class DirectoryEntry:
+    """One storage or stream in the compound file's directory."""
+
+    __slots__ = ("sid", "name", "entry_type", "left", "right", "child", "start", "size", "kids")
+
+    def __init__(self, sid: int, data: memoryview, major_version: int):
+        name_length = min(int.from_bytes(data[64:66], "little"), 64)
+        self.sid = sid
+        self.name = bytes(data[: max(name_length - 2, 0)]).decode("utf-16-le", "replace")
+        self.entry_type = data[66]
+        self.left, self.right, self.child = struct.unpack_from("<3I", data, 68)
+        self.start, self.size = struct.unpack_from("<IQ", data, 116)
+        if major_version == 3:
+            # Version 3 files may leave garbage in the high half of the size.
+            self.size &= 0xFFFF_FFFF
+        self.kids: List[DirectoryEntry] = []
+
+    def __repr__(self):
+        return f"DirectoryEntry({self.name!r}, type={self.entry_type}, size={self.size})"
+
+
+class CompoundStream:
+    """Seekable, read-only file object over the data of one stream.
+
+    :meth:`read` returns ``bytes`` like the streams returned by olefile;
+    :meth:`read_view` and :meth:`getbuffer` return views of the data without
+    copying it.
+    """
+
+    def __init__(self, data: memoryview):
+        self._data = data
+        self._pos = 0
+        self.size = len(data)
+
+    def read_view(self, size: int = -1) -> memoryview:
+        start = min(self._pos, self.size)
+        end = self.size if size is None or size < 0 else min(start + size, self.size)
+        self._pos = end
+        return self._data[start:end]
+
+    def read(self, size: int = -1) -> bytes:
+        return bytes(self.read_view(size))
+
+    def getbuffer(self) -> memoryview:
+        return self._data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self._pos = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CompoundFile:
+    """Compound file read from ``source``.
+
+    ``source`` is a buffer (``bytes``, ``memoryview``, ``mmap``) or a binary
+    file object.  Files with a file descriptor are mapped read-only; other
+    file objects are read into memory.
+    """
+
+    def __init__(self, source: Union[bytes, bytearray, memoryview, mmap.mmap, io.IOBase]):
+        self._mmap: Optional[mmap.mmap] = None
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            buffer = source
+        else:
+            try:
+                fileno = source.fileno()
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                source.seek(0)
+                buffer = source.read()
+            else:
+                self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+                buffer = self._mmap
+        self._view = memoryview(buffer).cast("B")
+        self._streams: Dict[int, memoryview] = {}
+
+        self._read_header()
+        self.fat = self._read_fat()
+        self.direntries = self._read_directory()
+        self.root = self.direntries[0]
+        if self.root.entry_type != STGTY_ROOT:
+            raise ValueError("First directory entry is not the root storage")
+        self.minifat = self._read_minifat()
+        self._ministream: Optional[memoryview] = None
+        self._build_tree()
+
+    def _read_header(self):
+        view = self._view
+        if len(view) < _HEADER_SIZE or view[:8] != MAGIC:
+            raise ValueError("Not a compound file: bad signature")
+        (
+            self.major_version,
+            byte_order,
+            sector_shift,
+            mini_sector_shift,
+        ) = struct.unpack_from("<HHHH", view, 26)
+        if byte_order != 0xFFFE:
+            raise ValueError(f"Unsupported compound file byte order: {byte_order:#06x}")
+        if (self.major_version, sector_shift) not in ((3, 9), (4, 12)):
+            raise ValueError(
+                f"Unsupported compound file version {self.major_version} "
+                f"with sector size 2**{sector_shift}"
+            )
+        (
+            self._num_fat_sectors,
+            self._first_dir_sector,
+            _transaction,
+            self.mini_stream_cutoff,
+            self._first_minifat_sector,
+            self._num_minifat_sectors,
+            self._first_difat_sector,
+            self._num_difat_sectors,
+        ) = struct.unpack_from("<8I", view, 44)
+        self.sector_shift = sector_shift
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_shift = mini_sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+
+    def _sector(self, sector: int) -> memoryview:
+        start = (sector + 1) << self.sector_shift
+        if sector > MAXREGSECT or start + self.sector_size > len(self._view):
+            raise ValueError(f"Invalid sector number {sector:#x}")
+        return self._view[start : start + self.sector_size]
+
+    def _read_fat(self) -> array.array:
+        difat = _u32_array(self._view[76 : 76 + 4 * _NUM_HEADER_DIFAT])
+        sector = self._first_difat_sector
+        entries_per_sector = self.sector_size // 4 - 1
+        for _ in range(self._num_difat_sectors):
+            if sector > MAXREGSECT:
+                break
+            entries = _u32_array(self._sector(sector))
+            difat.extend(entries[:entries_per_sector])
+            sector = entries[entries_per_sector]
+        fat_sectors = [s for s in difat[: self._num_fat_sectors] if s <= MAXREGSECT]
+        return _u32_array(b"".join(self._sector(s) for s in fat_sectors))
+
+    def _read_directory(self) -> List[DirectoryEntry]:
+        data = self._fat_chain(self._first_dir_sector, None)
+        return [
+            DirectoryEntry(sid, data[offset : offset + _DIRENTRY_SIZE], self.major_version)
+            for sid, offset in enumerate(range(0, len(data) - _DIRENTRY_SIZE + 1, _DIRENTRY_SIZE))
+        ]
+
+    def _read_minifat(self) -> array.array:
+        if self._num_minifat_sectors == 0 or self._first_minifat_sector > MAXREGSECT:
+            return array.array(_U32_TYPECODE)
+        size = self._num_minifat_sectors << self.sector_shift
+        return _u32_array(self._fat_chain(self._first_minifat_sector, size))
+
+    def _build_tree(self):
+        # Walk each storage's red-black tree of children; the visited set
+        # guards against corrupt files whose trees contain cycles.
+        visited = {0}
+        storages = [self.root]
+        while storages:
+            storage = storages.pop()
+            pending = [storage.child]
+            while pending:
+                sid = pending.pop()
+                if sid == NOSTREAM or sid in visited or sid >= len(self.direntries):
+                    continue
+                visited.add(sid)
+                entry = self.direntries[sid]
+                storage.kids.append(entry)
+                pending.extend((entry.left, entry.right))
+                if entry.entry_type == STGTY_STORAGE:
+                    storages.append(entry)
+            storage.kids.sort(key=lambda entry: entry.name)
+
+    def _chain(
+        self,
+        table: array.array,
+        start: int,
+        size: Optional[int],
+        base: memoryview,
+        shift: int,
+        base_offset: int,
+    ) -> memoryview:
+        """Return the data of the sector chain starting at ``start``.
+
+        Sector ``n`` of the chain's ``table`` (the FAT or MiniFAT) is stored
+        at ``base_offset + (n << shift)`` in ``base``.  ``size`` is the number
+        of bytes wanted; ``None`` follows the chain to its end.  A chain of
+        consecutive sectors is returned as a slice of ``base``; any other
+        chain is copied together.
+        """
+        if size == 0 or start == ENDOFCHAIN:
+            return base[0:0]
+        sector_size = 1 << shift
+        count = len(table) if size is None else (size + sector_size - 1) >> shift
+        if size is not None and start + count <= len(table):
+            # Most streams are written in one piece, which a single array
+            # comparison confirms without walking the chain.
+            begin = base_offset + (start << shift)
+            if begin + size <= len(base) and table[start : start + count - 1] == array.array(
+                table.typecode, range(start + 1, start + count)
+            ):
+                return base[begin : begin + size]
+
+        chunks = []
+        current = start
+        while current != ENDOFCHAIN and len(chunks) < count:
+            if current > MAXREGSECT or current >= len(table):
+                raise ValueError(f"Broken sector chain starting at sector {start}")
+            begin = base_offset + (current << shift)
+            chunks.append(base[begin : begin + sector_size])
+            current = table[current]
+        if size is None and current != ENDOFCHAIN:
+            raise ValueError(f"Sector chain starting at sector {start} does not end")
+        data = memoryview(b"".join(chunks))
+        if size is None:
+            return data
+        if len(data) < size:
+            raise ValueError(f"Stream data starting at sector {start} is truncated")
+        return data[:size]
+
+    def _fat_chain(self, start: int, size: Optional[int]) -> memoryview:
+        return self._chain(self.fat, start, size, self._view, self.sector_shift, self.sector_size)
+
+    def _find(self, name: str) -> DirectoryEntry:
+        entry = self.root
+        for part in name.split("/"):
+            part = part.lower()
+            for kid in entry.kids:
+                if kid.name.lower() == part:
+                    entry = kid
+                    break
+            else:
+                raise FileNotFoundError(f"Stream {name!r} not found in compound file")
+        return entry
+
+    def stream_view(self, name: str) -> memoryview:
+        """Return the data of stream ``name`` (case-insensitive, with ``/``
+        between storage names) as a read-only memoryview."""
+        entry = self._find(name)
+        if entry.entry_type != STGTY_STREAM:
+            raise OSError(f"{name!r} is not a stream")
+        data = self._streams.get(entry.sid)
+        if data is None:
+            if entry.size < self.mini_stream_cutoff:
+                base = self._get_ministream()
+                data = self._chain(
+                    self.minifat, entry.start, entry.size, base, self.mini_sector_shift, 0
+                )
+            else:
+                base = self._view
+                data = self._fat_chain(entry.start, entry.size)
+            # Only views of the file (or of the ministream) are kept; streams
+            # whose sectors are scattered are copied together on each call
+            # rather than held for the life of the file.
+            if data.obj is base.obj:
+                self._streams[entry.sid] = data
+        return data
+
+    def _get_ministream(self) -> memoryview:
+        if self._ministream is None:
+            self._ministream = self._fat_chain(self.root.start, self.root.size)
+        return self._ministream
+
+    def openstream(self, name: str) -> CompoundStream:
+        """Open stream ``name`` as a read-only file object."""
+        return CompoundStream(self.stream_view(name))
+
+    def exists(self, name: str) -> bool:
+        try:
+            self._find(name)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get_size(self, name: str) -> int:
+        return self._find(name).size
+
+    def close(self):
+        """Release the file mapping.
+
+        A mapping that is still referenced by stream views handed out
+        earlier stays open until those views are garbage-collected.
+        """
+        self._streams.clear()
+        self._ministream = None
+        if self._mmap is not None:
+            try:
+                self._view.release()
+                self._mmap.close()
+            except BufferError:
+                pass
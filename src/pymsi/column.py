@@ -1,4 +1,6 @@
-from typing import Optional
+import array
+import sys
+from typing import List, Optional
 
 from pymsi.constants import (
     COL_FIELD_SIZE_MASK,
@@ -8,11 +10,14 @@ from pymsi.constants import (
     COL_STRING_BIT,
     COL_VALID_BIT,
 )
-from pymsi.reader import BinaryReader
 from pymsi.stringpool import StringPool
 
 _BINARY_CELL = "<binary>"
 
+_BIG_ENDIAN = sys.byteorder == "big"
+_U16_TYPECODE = "H"
+_U32_TYPECODE = "I" if array.array("I").itemsize == 4 else "L"
+
 
 class Column:
     def __init__(self, name: str, bits: Optional[int] = None):
@@ -70,26 +75,77 @@ class Column:
             return 3 if long_string_refs else 2
         return self.size
 
-    def read_value(self, reader: BinaryReader, string_pool: StringPool):
+    def read_cells(self, data: memoryview, long_string_refs: bool) -> array.array:
+        """Unpack the raw little-endian cells of this column.
+
+        ``data`` is the column's contiguous slice of a column-major table
+        stream.  String columns yield string pool references, integer columns
+        yield the stored (biased) values.
+        """
+        width = self.width(long_string_refs)
+        if width == 3:
+            # Widen each 3-byte string reference to 4 bytes so it can be
+            # unpacked as a plain array of unsigned 32-bit integers.
+            num_cells = len(data) // 3
+            padded = bytearray(num_cells * 4)
+            padded[0::4] = data[0::3]
+            padded[1::4] = data[1::3]
+            padded[2::4] = data[2::3]
+            data = memoryview(padded)
+            width = 4
+        cells = array.array(_U32_TYPECODE if width == 4 else _U16_TYPECODE)
+        cells.frombytes(data)
+        if _BIG_ENDIAN:
+            cells.byteswap()
+        return cells
+
+    def decode_cell(self, cell: int, string_pool: StringPool):
+        """Decode one raw cell from :meth:`read_cells` into its row value."""
         if self.type == "str":
-            return string_pool.read_string(reader)
+            return string_pool.resolve(cell)
         elif self.type == "i32":
-            val = reader.read_i32_le()
-            if val == 0:
-                return None
-            return val ^ -0x8000_0000
+            return None if cell == 0 else cell - 0x8000_0000
         elif self.type == "i16":
-            val = reader.read_i16_le()
-            if val == 0:
-                return None
-            return val ^ -0x8000
+            return None if cell == 0 else cell - 0x8000
         elif self.type == "binary":
-            # The payload lives in a separate OLE stream.
-            reader.read_i16_le()
             return _BINARY_CELL
         else:
             raise ValueError(f"Unknown column type: {self.type}")
 
+    def decode_cells(self, cells: array.array, string_pool: StringPool) -> List:
+        """Decode raw cells from :meth:`read_cells` into row values."""
+        if self.type == "str":
+            return string_pool.resolve_all(cells)
+        elif self.type == "i32":
+            return [None if val == 0 else val - 0x8000_0000 for val in cells]
+        elif self.type == "i16":
+            return [None if val == 0 else val - 0x8000 for val in cells]
+        elif self.type == "binary":
+            return [_BINARY_CELL] * len(cells)
+        else:
+            raise ValueError(f"Unknown column type: {self.type}")
+
+    def encode_cells(self, value, string_pool: StringPool) -> List[int]:
+        """Return the raw cells that :meth:`decode_cell` maps to ``value``.
+
+        This is normally a single cell; it is empty when no stored cell can
+        hold the value (e.g. a string missing from the string pool), and a
+        string the pool holds more than once has one cell per copy.
+        """
+        if value is None:
+            return [0]
+        if self.type == "str":
+            return string_pool.find(value) if isinstance(value, str) else []
+        elif self.type in ("i32", "i16"):
+            bias = 0x8000_0000 if self.type == "i32" else 0x8000
+            if not isinstance(value, int) or not -bias < value < bias:
+                return []
+            return [value + bias]
+        elif self.type == "binary":
+            return []
+        else:
+            raise ValueError(f"Unknown column type: {self.type}")
+
     def mark_primary_key(self):
         self.primary_key = True
         return self
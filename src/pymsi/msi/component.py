@@ -1,14 +1,32 @@
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Mapping, Optional
 
 from pymsi.msi.directory import Directory
 from pymsi.msi.file import File
+from pymsi.msi.linker import MISSING, add_entity, entity_view
 from pymsi.msi.registry import Registry
 from pymsi.msi.remove_file import RemoveFile
 from pymsi.msi.shortcut import Shortcut
 
+if TYPE_CHECKING:
+    from .linker import Linker
+
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/component-table
 class Component:
+    __slots__ = (
+        "id",
+        "guid",
+        "_directory",
+        "attributes",
+        "condition",
+        "key_path",
+        "directory",
+        "_files",
+        "_shortcuts",
+        "_registry_keys",
+        "_remove_files",
+    )
+
     def __init__(self, row: Dict):
         self.id: str = row["Component"]
         self.guid = row["ComponentId"]
@@ -17,30 +35,52 @@ class Component:
         self.condition: str = row["Condition"]
         self.key_path: str = row["KeyPath"]
 
-        self.files: Dict[str, "File"] = {}
-        self.shortcuts: Dict[str, "Shortcut"] = {}
-        self.registry_keys: Dict[str, "Registry"] = {}
-        self.remove_files: Dict[str, "RemoveFile"] = {}
+        self._files: Optional[Dict[str, "File"]] = None
+        self._shortcuts: Optional[Dict[str, "Shortcut"]] = None
+        self._registry_keys: Optional[Dict[str, "Registry"]] = None
+        self._remove_files: Optional[Dict[str, "RemoveFile"]] = None
+
+    @property
+    def files(self) -> Mapping[str, "File"]:
+        return entity_view(self._files)
+
+    @property
+    def shortcuts(self) -> Mapping[str, "Shortcut"]:
+        return entity_view(self._shortcuts)
+
+    @property
+    def registry_keys(self) -> Mapping[str, "Registry"]:
+        return entity_view(self._registry_keys)
+
+    @property
+    def remove_files(self) -> Mapping[str, "RemoveFile"]:
+        return entity_view(self._remove_files)
 
     def _add_file(self, file: "File"):
-        self.files[file.id] = file
+        self._files = add_entity(self._files, file)
 
     def _add_shortcut(self, shortcut: "Shortcut"):
-        self.shortcuts[shortcut.id] = shortcut
+        self._shortcuts = add_entity(self._shortcuts, shortcut)
 
     def _add_registry_key(self, registry: "Registry"):
-        self.registry_keys[registry.id] = registry
+        self._registry_keys = add_entity(self._registry_keys, registry)
 
     def _add_remove_file(self, remove_file: "RemoveFile"):
-        self.remove_files[remove_file.id] = remove_file
+        self._remove_files = add_entity(self._remove_files, remove_file)
 
-    def _populate(self, directory_map: Dict[str, Directory]):
-        self.directory = directory_map[self._directory]
-        self.directory._add_component(self)
+    def _populate(self, linker: "Linker"):
+        self.directory: Directory = linker.resolve(
+            linker.directories, self._directory, "Component", self.id, "Directory_", "Directory"
+        )
+        if self.directory is not None:
+            self.directory._add_component(self)
 
     def pretty_print(self, indent: int = 0):
         print(" " * indent + f"Component: {self.id} (GUID: {self.guid})")
-        print(" " * (indent + 2) + f"Directory: {self.directory.name} ({self.directory.id})")
+        if self.directory is None:
+            print(" " * (indent + 2) + f"Directory: {self._directory} {MISSING}")
+        else:
+            print(" " * (indent + 2) + f"Directory: {self.directory.name} ({self.directory.id})")
         print(" " * (indent + 2) + f"Attributes: {self.attributes}")
         print(" " * (indent + 2) + f"Condition: {self.condition}")
         print(" " * (indent + 2) + f"KeyPath: {self.key_path}")
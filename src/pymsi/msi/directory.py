@@ -1,13 +1,27 @@
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict, Mapping, Optional
+
+from pymsi.msi.linker import LinkWarning, add_entity, entity_view
 
 if TYPE_CHECKING:
     from .component import Component
+    from .linker import Linker
     from .remove_file import RemoveFile
     from .shortcut import Shortcut
 
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/directory-table
 class Directory:
+    __slots__ = (
+        "id",
+        "_parent",
+        "name",
+        "parent",
+        "_children",
+        "_components",
+        "_shortcuts",
+        "_remove_files",
+    )
+
     def __init__(self, row: Dict):
         self.id: str = row["Directory"]
         self._parent: str = row["Directory_Parent"]
@@ -26,32 +40,58 @@ class Directory:
         if "|" in self.name:
             self.name = self.name.split("|", 1)[0]
 
-        self.children: Dict[str, "Directory"] = {}
-        self.components: Dict[str, "Component"] = {}
-        self.shortcuts: Dict[str, "Shortcut"] = {}
-        self.remove_files: Dict[str, "RemoveFile"] = {}
+        self._children: Optional[Dict[str, "Directory"]] = None
+        self._components: Optional[Dict[str, "Component"]] = None
+        self._shortcuts: Optional[Dict[str, "Shortcut"]] = None
+        self._remove_files: Optional[Dict[str, "RemoveFile"]] = None
+
+    @property
+    def children(self) -> Mapping[str, "Directory"]:
+        return entity_view(self._children)
+
+    @property
+    def components(self) -> Mapping[str, "Component"]:
+        return entity_view(self._components)
+
+    @property
+    def shortcuts(self) -> Mapping[str, "Shortcut"]:
+        return entity_view(self._shortcuts)
+
+    @property
+    def remove_files(self) -> Mapping[str, "RemoveFile"]:
+        return entity_view(self._remove_files)
 
     def _add_child(self, child: "Directory"):
-        self.children[child.id] = child
+        self._children = add_entity(self._children, child)
 
     def _add_component(self, component: "Component"):
-        self.components[component.id] = component
+        self._components = add_entity(self._components, component)
 
     def _add_shortcut(self, shortcut: "Shortcut"):
-        self.shortcuts[shortcut.id] = shortcut
+        self._shortcuts = add_entity(self._shortcuts, shortcut)
 
     def _add_remove_file(self, remove_file: "RemoveFile"):
-        self.remove_files[remove_file.id] = remove_file
+        self._remove_files = add_entity(self._remove_files, remove_file)
 
-    def _populate(self, directory_map: Dict[str, "Directory"]):
+    def _populate(self, linker: "Linker"):
+        directory_map = linker.directories
         if self._parent and self._parent != self.id:
             if self._parent not in directory_map:
-                print(
-                    f"Warning: Parent directory '{self._parent}' not found for directory '{self.id}'."
+                linker.warn(
+                    LinkWarning(
+                        "Directory",
+                        self.id,
+                        "Directory_Parent",
+                        "Directory",
+                        self._parent,
+                        "added it as a placeholder under TARGETDIR",
+                    )
                 )
-                directory_map[self._parent] = Directory(
+                placeholder = Directory(
                     {"Directory": self._parent, "Directory_Parent": "TARGETDIR", "DefaultDir": "."}
                 )
+                directory_map[self._parent] = placeholder
+                placeholder._populate(linker)
 
             self.parent = directory_map[self._parent]
             self.parent._add_child(self)
@@ -1,14 +1,29 @@
 from typing import TYPE_CHECKING, Dict
 
+from pymsi.msi.linker import MISSING, LinkWarning, describe_component
 from pymsi.thirdparty.refinery.cab import CabFile
 
 if TYPE_CHECKING:
     from .component import Component
+    from .linker import Linker
     from .media import Media
 
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/file-table
 class File:
+    __slots__ = (
+        "id",
+        "_component",
+        "name",
+        "size",
+        "version",
+        "language",
+        "attributes",
+        "sequence",
+        "component",
+        "media",
+    )
+
     def __init__(self, row: Dict):
         self.id: str = row["File"]
         self._component: str = row["Component_"]
@@ -22,6 +37,12 @@ class File:
         self.sequence: int = row["Sequence"]
 
     def resolve(self) -> CabFile:
+        if self.media is None:
+            raise ValueError(
+                f"File {self.id} ({self.name}) has no Media row: sequence {self.sequence} is past "
+                "the LastSequence of every Media row."
+            )
+
         if not hasattr(self.media, "cabinet"):
             raise ValueError(
                 f"Media for file {self.id} ({self.name}) is not resolved. Make sure load_data is set to True."
@@ -32,19 +53,30 @@ class File:
                 f"Media for file {self.id} ({self.name}) does not have an associated .cab file."
             )
 
-        for file in self.media.cabinet.get_files():
-            if file.name == self.id:
-                return file
+        file = self.media.cabinet.get_file(self.id)
+        if file is not None:
+            return file
         raise ValueError(f"File {self.name} not found in media cabinet {self.media.cabinet}.")
 
-    def _populate(self, component_map: Dict[str, "Component"], media_map: Dict[int, "Media"]):
-        self.component = component_map[self._component]
-        self.component._add_file(self)
-
-        self.media = min(
-            [media for media in media_map.values() if media.last_sequence >= self.sequence],
-            key=lambda m: m.last_sequence,
+    def _populate(self, linker: "Linker"):
+        self.component: "Component" = linker.resolve(
+            linker.components, self._component, "File", self.id, "Component_", "Component"
         )
+        if self.component is not None:
+            self.component._add_file(self)
+
+        self.media: "Media" = linker.media_index.find(self.sequence)
+        if self.media is None:
+            linker.dangling(
+                LinkWarning(
+                    "File",
+                    self.id,
+                    "Sequence",
+                    "Media",
+                    self.sequence,
+                    "the sequence number is past the LastSequence of every Media row",
+                )
+            )
 
     def pretty_print(self, indent: int = 0):
         print(" " * indent + f"File: {self.name} ({self.id})")
@@ -53,13 +85,14 @@ class File:
         print(" " * (indent + 2) + f"Language(s): {', '.join(self.language)}")
         print(" " * (indent + 2) + f"Attributes: {hex(self.attributes)} ({self.attributes})")
         print(" " * (indent + 2) + f"Sequence: {self.sequence}")
-        print(
-            " " * (indent + 2) + f"Component: {self.component.id} ({self.component.directory.name})"
-        )
-        print(
-            " " * (indent + 2)
-            + f"Media: {self.media.id} (Last Sequence: {self.media.last_sequence})"
-        )
+        print(" " * (indent + 2) + f"Component: {describe_component(self)}")
+        if self.media is None:
+            print(" " * (indent + 2) + f"Media: {MISSING}")
+        else:
+            print(
+                " " * (indent + 2)
+                + f"Media: {self.media.id} (Last Sequence: {self.media.last_sequence})"
+            )
         if hasattr(self.media, "cabinet") and self.media.cabinet is not None:
             file = self.resolve()
             print(" " * (indent + 2) + f"Cabinet Size: {file.size} bytes")
@@ -3,6 +3,8 @@ from typing import Dict, Optional
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/icon-table
 class Icon:
+    __slots__ = ("id", "data")
+
     def __init__(self, row: Dict):
         self.id: str = row["Name"]
         # Msi populates the external OBJECT stream when load_data=True.
@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, TypeVar
+
+from pymsi.msi.media import MediaIndex
+
+if TYPE_CHECKING:
+    from .component import Component
+    from .directory import Directory
+    from .icon import Icon
+    from .msi import Msi
+
+# Printed in place of a link that was left unresolved with ``strict=False``.
+MISSING = "<missing>"
+
+
+def describe_component(entity: Any) -> str:
+    """Describe the component ``entity`` links to for ``pretty_print``."""
+    component = entity.component
+    if component is None:
+        return f"{entity._component} {MISSING}"
+    directory = component.directory
+    return f"{component.id} ({MISSING if directory is None else directory.name})"
+
+
+E = TypeVar("E")
+
+# Returned for the child collections of entities that have no children, so
+# that most entities do not hold empty dicts.
+NO_ENTITIES: Mapping = MappingProxyType({})
+
+
+def entity_view(entities: Optional[Dict[str, E]]) -> Mapping[str, E]:
+    """Return a read-only view of a child collection, empty if it is ``None``."""
+    return NO_ENTITIES if entities is None else MappingProxyType(entities)
+
+
+def add_entity(entities: Optional[Dict[str, E]], entity: E) -> Dict[str, E]:
+    """Add ``entity`` to a child collection, creating it if it is ``None``."""
+    if entities is None:
+        entities = {}
+    entities[entity.id] = entity
+    return entities
+
+
+@dataclass(frozen=True)
+class LinkWarning:
+    """A column whose value names a row that does not exist in another table."""
+
+    table: str
+    row: Any
+    column: str
+    target: str
+    reference: Any
+    detail: Optional[str] = None
+
+    def __str__(self) -> str:
+        message = (
+            f"{self.table} {self.row!r}: {self.column} refers to {self.target} "
+            f"{self.reference!r}, which does not exist"
+        )
+        return f"{message}; {self.detail}" if self.detail else message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "table": self.table,
+            "row": self.row,
+            "column": self.column,
+            "target": self.target,
+            "reference": self.reference,
+            "detail": self.detail,
+        }
+
+
+class Linker:
+    """Resolves the references between the entities of an :class:`Msi`.
+
+    Every entity is linked exactly once, referenced tables before the tables
+    that refer to them, with one dict lookup per reference.  A reference to a
+    missing row raises ``ValueError`` when ``strict`` is set; otherwise it is
+    recorded in :attr:`warnings` and the link is left as ``None``.
+    """
+
+    def __init__(self, msi: "Msi", strict: bool = True):
+        self.strict = strict
+        self.warnings: List[LinkWarning] = []
+        self._msi = msi
+        self._media_index: Optional[MediaIndex] = None
+
+    # The collections are looked up on the Msi when they are first needed, so
+    # that an Msi that builds its collections lazily only builds those that
+    # the linked entities refer to.
+    @property
+    def directories(self) -> Dict[str, "Directory"]:
+        return self._msi.directories
+
+    @property
+    def components(self) -> Dict[str, "Component"]:
+        return self._msi.components
+
+    @property
+    def icons(self) -> Dict[str, "Icon"]:
+        return self._msi.icons
+
+    @property
+    def media_index(self) -> MediaIndex:
+        if self._media_index is None:
+            self._media_index = MediaIndex(self._msi.medias.values())
+        return self._media_index
+
+    def link_entities(self, entities: Iterable[Any]):
+        # Directories can add placeholders for missing parents to their map
+        # while it is iterated; those are linked as they are added.
+        for entity in list(entities):
+            entity._populate(self)
+
+    def warn(self, warning: LinkWarning):
+        self.warnings.append(warning)
+
+    def resolve(
+        self,
+        entities: Dict[Any, Any],
+        reference: Any,
+        table: str,
+        row: Any,
+        column: str,
+        target: str,
+    ) -> Optional[Any]:
+        """Return ``entities[reference]``, reporting a dangling reference if it is missing."""
+        entity = entities.get(reference)
+        if entity is None:
+            self.dangling(LinkWarning(table, row, column, target, reference))
+        return entity
+
+    def dangling(self, warning: LinkWarning):
+        if self.strict:
+            raise ValueError(str(warning))
+        self.warn(warning)
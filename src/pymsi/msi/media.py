@@ -1,10 +1,21 @@
-from typing import Dict, Optional
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Union
 
 from pymsi.thirdparty.refinery.cab import Cabinet
 
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/media-table
 class Media:
+    __slots__ = (
+        "id",
+        "last_sequence",
+        "disk_prompt",
+        "_cabinet",
+        "volume_label",
+        "source",
+        "cabinet",
+    )
+
     def __init__(self, row: Dict):
         self.id: int = row["DiskId"]
         self.last_sequence: int = row["LastSequence"]
@@ -13,12 +24,14 @@ class Media:
         self.volume_label: Optional[str] = row["VolumeLabel"]
         self.source: Optional[str] = row["Source"]
 
-    def _populate(self, archive: Optional[bytes]):
+    def _populate(self, archive: Optional[Union[bytes, memoryview]], verify: str = "lazy"):
         if archive is None:
             self.cabinet = None
             return
-        self.cabinet = Cabinet(archive)
+        self.cabinet = Cabinet(archive, compute_checksums=verify != "off", verify=verify == "lazy")
         self.cabinet.process()
+        if verify == "eager":
+            self.cabinet.check()
 
     def pretty_print(self, indent: int = 0):
         print(" " * indent + f"Media: {self.id}")
@@ -31,3 +44,19 @@ class Media:
             print(" " * (indent + 2) + f"Volume Label: {self.volume_label}")
         if self.source:
             print(" " * (indent + 2) + f"Source: {self.source}")
+
+
+class MediaIndex:
+    """Media sorted by last sequence number, to find the media holding a file."""
+
+    def __init__(self, medias: Iterable[Media]):
+        self._medias = sorted(medias, key=lambda media: media.last_sequence)
+        self._last_sequences = [media.last_sequence for media in self._medias]
+
+    def find(self, sequence: int) -> Optional[Media]:
+        """Return the media with the smallest last sequence number that is at
+        least ``sequence``, or ``None`` if every media ends before it."""
+        index = bisect_left(self._last_sequences, sequence)
+        if index == len(self._medias):
+            return None
+        return self._medias[index]
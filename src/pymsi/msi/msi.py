@@ -1,10 +1,15 @@
-from typing import Any, Dict, Optional, Type, TypeVar, Union
+import mmap
+import os
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Type, TypeVar, Union
 
 from pymsi import streamname
 from pymsi.msi.component import Component
 from pymsi.msi.directory import Directory
 from pymsi.msi.file import File
 from pymsi.msi.icon import Icon
+from pymsi.msi.linker import Linker, LinkWarning
 from pymsi.msi.media import Media
 from pymsi.msi.registry import Registry
 from pymsi.msi.remove_file import RemoveFile
@@ -13,38 +18,119 @@ from pymsi.package import Package
 
 T = TypeVar("T")
 
+VERIFY_POLICIES = ("off", "lazy", "eager")
+
 
 class Msi:
-    def __init__(self, package: Package, load_data: bool = False, strict: bool = True):
+    def __init__(
+        self,
+        package: Package,
+        load_data: bool = False,
+        strict: bool = True,
+        verify: str = "off",
+        lazy: bool = False,
+    ):
+        """Build the object model of ``package``.
+
+        ``verify`` sets when the CFDATA checksums of cabinets loaded with
+        ``load_data`` are checked: ``"off"`` never, ``"lazy"`` when a
+        cabinet folder is first decompressed, and ``"eager"`` while loading.
+        A mismatch raises ``CabVolumeCorrupt``; the default is ``"off"``.
+
+        With ``lazy``, each collection (``files``, ``registry_keys``, ...)
+        and ``root`` is built on first access, together with only the
+        collections it links to.  The child collections of an entity, such as
+        ``Component.files``, are filled in when the collection holding the
+        children is built.
+        """
+        if verify not in VERIFY_POLICIES:
+            raise ValueError(f"verify must be one of {', '.join(VERIFY_POLICIES)}, not {verify!r}")
         self.package = package
+        self.verify = verify
         self.warnings = []
-
-        self.components = self._load_map(Component, "Component")
-        self.directories = self._load_map(Directory, "Directory")
-        self.files = self._load_map(File, "File")
-        self.icons = self._load_map(Icon, "Icon")
-        self.registry_keys = self._load_map(Registry, "Registry")
-        self.remove_files = self._load_map(RemoveFile, "RemoveFile")
-        self.shortcuts = self._load_map(Shortcut, "Shortcut")
-        self.medias = self._load_map(Media, "Media")
-
-        if load_data:
-            self._load_media()
+        self._load_data = load_data
+        self._strict = strict
+        self._linker = Linker(self, strict)
+        self.link_warnings: List[LinkWarning] = self._linker.warnings
+
+        if not lazy:
+            for name in (
+                "directories",
+                "components",
+                "files",
+                "registry_keys",
+                "remove_files",
+                "shortcuts",
+                "icons",
+                "medias",
+                "root",
+            ):
+                getattr(self, name)
+
+    @cached_property
+    def directories(self) -> Dict[str, Directory]:
+        return self._build("directories", Directory, "Directory")
+
+    @cached_property
+    def components(self) -> Dict[str, Component]:
+        return self._build("components", Component, "Component")
+
+    @cached_property
+    def files(self) -> Dict[str, File]:
+        return self._build("files", File, "File")
+
+    @cached_property
+    def registry_keys(self) -> Dict[str, Registry]:
+        return self._build("registry_keys", Registry, "Registry")
+
+    @cached_property
+    def remove_files(self) -> Dict[str, RemoveFile]:
+        return self._build("remove_files", RemoveFile, "RemoveFile")
+
+    @cached_property
+    def shortcuts(self) -> Dict[str, Shortcut]:
+        return self._build("shortcuts", Shortcut, "Shortcut")
+
+    @cached_property
+    def icons(self) -> Dict[str, Icon]:
+        icons = self._build("icons", Icon, "Icon", link=False)
+        if self._load_data:
             self._load_icons()
+        return icons
 
-        self._populate_map(self.components, self.directories)
-        self._populate_map(self.directories, self.directories)
-        self._populate_map(self.files, self.components, self.medias)
-        self._populate_map(self.registry_keys, self.components)
-        self._populate_map(self.remove_files, self.components, self.directories)
-        self._populate_map(self.shortcuts, self.directories, self.components, self.icons)
+    @cached_property
+    def medias(self) -> Dict[int, Media]:
+        medias = self._build("medias", Media, "Media", link=False)
+        if self._load_data:
+            self._load_media()
+        return medias
 
-        self.roots = [
+    @cached_property
+    def roots(self) -> List[Directory]:
+        return [
             directory
             for directory in self.directories.values()
             if directory._parent is None or directory.id == directory._parent
         ]
-        self.root = self._load_root(strict)
+
+    @cached_property
+    def root(self) -> Directory:
+        return self._load_root(self._strict)
+
+    def _build(self, name: str, type_val: Type[T], table_name: str, link: bool = True):
+        entities = self._load_map(type_val, table_name)
+        # Stored before linking, since linking looks up other collections
+        # and directories look up their own.
+        self.__dict__[name] = entities
+        if link:
+            try:
+                self._linker.link_entities(entities.values())
+            except Exception:
+                # Do not leave a half-linked collection cached; the next
+                # access builds it again and raises again.
+                del self.__dict__[name]
+                raise
+        return entities
 
     def _load_map(self, type_val: Type[T], name: str):
         table = self.package.get(name)
@@ -55,24 +141,6 @@ class Msi:
                 ret[val.id] = val
         return ret
 
-    @staticmethod
-    def _populate_map(
-        map: Optional[Union[Dict[str, T], Dict[int, T]]],
-        *inputs: Union[Dict[str, Any], Dict[int, Any]],
-    ):
-        if map is None:
-            return
-
-        processed = set()
-        while True:
-            before_count = len(map)
-            for key in list(map.keys()):
-                if key not in processed:
-                    map[key]._populate(*inputs)
-                    processed.add(key)
-            if len(map) == before_count:
-                break
-
     def _load_icons(self):
         table = self.package.get("Icon")
         if table is None:
@@ -88,7 +156,7 @@ class Msi:
     def _load_media(self):
         for media in self.medias.values():
             if media._cabinet is None:
-                media._populate(None)
+                media._populate(None, self.verify)
             elif media._cabinet.startswith("#"):
                 # Inside the .msi file
                 stream_name = streamname.encode_unicode(media._cabinet[1:])
@@ -96,8 +164,9 @@ class Msi:
                     raise ValueError(
                         f"Media file '{media._cabinet[1:]}' not found in the .msi file"
                     )
-                with self.package.ole.openstream(stream_name) as stream:
-                    media._populate(stream.read())
+                # The cabinet is parsed in place, so a large embedded cabinet
+                # is not copied into memory first.
+                media._populate(self.package.stream_view(stream_name), self.verify)
             else:
                 # External cabinet file
                 path = (self.package.path.parent / media._cabinet).resolve(True)
@@ -109,8 +178,17 @@ class Msi:
 
                 if not path.is_file():
                     raise ValueError(f"External media file '{media._cabinet}' not found")
-                with path.open("rb") as f:
-                    media._populate(f.read())
+                media._populate(self._map_file(path), self.verify)
+
+    @staticmethod
+    def _map_file(path: Path) -> memoryview:
+        """Map ``path`` read-only, so its pages are only read as they are used."""
+        with path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped.
+                return memoryview(b"")
+            # The mapping stays valid after the file is closed.
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
 
     def _load_root(self, strict: bool):
         if len(self.roots) != 1:
@@ -1,11 +1,16 @@
 from typing import TYPE_CHECKING, Dict, Optional
 
+from pymsi.msi.linker import describe_component
+
 if TYPE_CHECKING:
     from .component import Component
+    from .linker import Linker
 
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/registry-table
 class Registry:
+    __slots__ = ("id", "root", "key", "name", "value", "_component", "component")
+
     def __init__(self, row: Dict):
         self.id: str = row["Registry"]
         root = row["Root"]
@@ -27,9 +32,12 @@ class Registry:
         self.value: Optional[str] = row["Value"]
         self._component: str = row["Component_"]
 
-    def _populate(self, component_map: Dict[str, "Component"]):
-        self.component = component_map[self._component]
-        self.component._add_registry_key(self)
+    def _populate(self, linker: "Linker"):
+        self.component: "Component" = linker.resolve(
+            linker.components, self._component, "Registry", self.id, "Component_", "Component"
+        )
+        if self.component is not None:
+            self.component._add_registry_key(self)
 
     def pretty_print(self, indent: int = 0):
         print(" " * indent + f"Registry Key: {self.id}")
@@ -38,6 +46,4 @@ class Registry:
             print(" " * (indent + 2) + f"Name: {self.name}")
         if self.value is not None:
             print(" " * (indent + 2) + f"Value: {self.value}")
-        print(
-            " " * (indent + 2) + f"Component: {self.component.id} ({self.component.directory.name})"
-        )
+        print(" " * (indent + 2) + f"Component: {describe_component(self)}")
@@ -1,12 +1,25 @@
 from typing import TYPE_CHECKING, Dict, Optional
 
+from pymsi.msi.linker import describe_component
+
 if TYPE_CHECKING:
     from .component import Component
     from .directory import Directory
+    from .linker import Linker
 
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/removefile-table
 class RemoveFile:
+    __slots__ = (
+        "id",
+        "_component",
+        "name",
+        "_dirproperty",
+        "install_mode",
+        "component",
+        "directory",
+    )
+
     def __init__(self, row: Dict):
         self.id: str = row["FileKey"]
         self._component: str = row["Component_"]
@@ -15,21 +28,21 @@ class RemoveFile:
         self._dirproperty: str = row["DirProperty"]
         self.install_mode: int = row["InstallMode"]
 
-    def _populate(
-        self, component_map: Dict[str, "Component"], directory_map: Dict[str, "Directory"]
-    ):
-        self.component = component_map[self._component]
-        self.component._add_remove_file(self)
+    def _populate(self, linker: "Linker"):
+        self.component: "Component" = linker.resolve(
+            linker.components, self._component, "RemoveFile", self.id, "Component_", "Component"
+        )
+        if self.component is not None:
+            self.component._add_remove_file(self)
 
-        self.directory = directory_map.get(self._dirproperty)
+        # Not a dangling reference when missing: the property may be set some other way.
+        self.directory: Optional["Directory"] = linker.directories.get(self._dirproperty)
         if self.directory is not None:
             self.directory._add_remove_file(self)
 
     def pretty_print(self, indent: int = 0):
         print(" " * indent + f"RemoveFile: {self.name} ({self.id})")
-        print(
-            " " * (indent + 2) + f"Component: {self.component.id} ({self.component.directory.name})"
-        )
+        print(" " * (indent + 2) + f"Component: {describe_component(self)}")
         if self.directory:
             print(" " * (indent + 2) + f"Directory: {self.directory.name} ({self.directory.id})")
         print(" " * (indent + 2) + f"Install Mode: {self.install_mode}")
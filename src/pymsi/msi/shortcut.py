@@ -1,13 +1,34 @@
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict, Optional
+
+from pymsi.msi.linker import describe_component
 
 if TYPE_CHECKING:
     from .component import Component
     from .directory import Directory
     from .icon import Icon
+    from .linker import Linker
 
 
 # https://learn.microsoft.com/en-us/windows/win32/msi/shortcut-table
 class Shortcut:
+    __slots__ = (
+        "id",
+        "_directory",
+        "name",
+        "_component",
+        "target",
+        "arguments",
+        "description",
+        "hotkey",
+        "_icon",
+        "icon_index",
+        "show_command",
+        "working_directory",
+        "directory",
+        "component",
+        "icon",
+    )
+
     def __init__(self, row: Dict):
         self.id: str = row["Shortcut"]
         self._directory: str = row["Directory_"]
@@ -22,22 +43,24 @@ class Shortcut:
         self.show_command: int = row["ShowCmd"]
         self.working_directory: str = row["WkDir"]
 
-    def _populate(
-        self,
-        directory_map: Dict[str, "Directory"],
-        component_map: Dict[str, "Component"],
-        icon_map: Dict[str, "Icon"],
-    ):
-        self.directory = directory_map[self._directory]
-        self.directory._add_shortcut(self)
+    def _populate(self, linker: "Linker"):
+        self.directory: "Directory" = linker.resolve(
+            linker.directories, self._directory, "Shortcut", self.id, "Directory_", "Directory"
+        )
+        if self.directory is not None:
+            self.directory._add_shortcut(self)
 
-        self.component = component_map[self._component]
-        self.component._add_shortcut(self)
+        self.component: "Component" = linker.resolve(
+            linker.components, self._component, "Shortcut", self.id, "Component_", "Component"
+        )
+        if self.component is not None:
+            self.component._add_shortcut(self)
 
+        self.icon: Optional["Icon"] = None
         if self._icon:
-            self.icon = icon_map[self._icon]
-        else:
-            self.icon = None
+            self.icon = linker.resolve(
+                linker.icons, self._icon, "Shortcut", self.id, "Icon_", "Icon"
+            )
 
     def pretty_print(self, indent: int = 0):
         print(" " * indent + f"Shortcut: {self.name} ({self.id})")
@@ -53,8 +76,6 @@ class Shortcut:
             print(" " * (indent + 2) + "Icon: None")
         print(" " * (indent + 2) + f"Show Command: {self.show_command}")
         print(" " * (indent + 2) + f"Working Directory: {self.working_directory}")
-        print(
-            " " * (indent + 2) + f"Component: {self.component.id} ({self.component.directory.name})"
-        )
+        print(" " * (indent + 2) + f"Component: {describe_component(self)}")
         if self.directory:
             print(" " * (indent + 2) + f"Directory: {self.directory.name} ({self.directory.id})")
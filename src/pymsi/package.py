@@ -2,12 +2,25 @@ import copy
 import io
 import mmap
 from pathlib import Path
-from typing import Iterator, List, Mapping, Optional, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import olefile
 
 from pymsi import streamname
 from pymsi.category import CATEGORIES_ALL
+from pymsi.cfb import CompoundFile
 from pymsi.column import Column
 from pymsi.constants import STRING_DATA_TABLE_NAME, STRING_POOL_TABLE_NAME, SUMMARY_INFO_STREAM_NAME
 from pymsi.reader import BinaryReader
@@ -20,41 +33,128 @@ from .summary import Summary
 
 class Package:
     # TODO: consider typing.BinaryIO
-    def __init__(self, path_or_bytesio: Union[Path, io.BytesIO, mmap.mmap], strict: bool = True):
+    def __init__(
+        self,
+        path_or_bytesio: Union[Path, io.BytesIO, mmap.mmap],
+        strict: bool = True,
+        lazy: bool = False,
+        use_mmap: bool = False,
+    ):
+        """Open an MSI package.
+
+        With ``lazy=True`` only the compound file directory is read here.  The
+        summary, string pool and table list are loaded the first time they
+        are used, and the column metadata in the _Validation table is only
+        read by :meth:`load_validation` or by methods that depend on it, such
+        as :meth:`join`.
+
+        With ``use_mmap=True`` the file is read by :mod:`pymsi.cfb` instead
+        of olefile: it is memory-mapped, and table and string data are read
+        from views of the mapping instead of being copied.
+        """
         if isinstance(path_or_bytesio, Path):
             self.path = path_or_bytesio.resolve(True)
             self.file = self.path.open("rb")
         else:
             self.path = None
             self.file = path_or_bytesio
-        self.tables = {}
         self.ole = None
         self.summary = None
-        self._load(strict=strict)
-
-    def _load(self, strict: bool):
-        self.ole = olefile.OleFileIO(self.file)
-
+        self.string_pool = None
+        self.tables = None
+        self._strict = strict
+        self._validation_loaded = False
+        # (table, foreign-key columns) -> {key values: [row numbers]}
+        self._join_indexes: Dict[Tuple[str, Tuple[str, ...]], Dict] = {}
+        self._load(lazy=lazy, use_mmap=use_mmap)
+
+    def _load(self, lazy: bool, use_mmap: bool):
+        if use_mmap:
+            self.ole = CompoundFile(self.file)
+        else:
+            self.ole = olefile.OleFileIO(self.file)
+        if not lazy:
+            self._load_summary()
+            self._load_tables()
+            self.load_validation()
+
+    @property
+    def summary(self) -> Summary:
+        if self._summary is None:
+            self._load_summary()
+        return self._summary
+
+    @summary.setter
+    def summary(self, summary: Optional[Summary]):
+        self._summary = summary
+
+    @property
+    def string_pool(self) -> StringPool:
+        if self._string_pool is None:
+            self._load_string_pool()
+        return self._string_pool
+
+    @string_pool.setter
+    def string_pool(self, string_pool: Optional[StringPool]):
+        self._string_pool = string_pool
+
+    @property
+    def tables(self) -> Dict[str, Table]:
+        if self._tables is None:
+            self._load_tables()
+        return self._tables
+
+    @tables.setter
+    def tables(self, tables: Optional[Dict[str, Table]]):
+        self._tables = tables
+
+    def _load_summary(self):
         with self.ole.openstream(SUMMARY_INFO_STREAM_NAME) as stream:
-            self.summary = Summary(stream)
+            self._summary = Summary(stream)
 
+    def _load_string_pool(self):
         with self.ole.openstream(
             streamname.encode_unicode(STRING_POOL_TABLE_NAME, True)
         ) as pool_stream:
             with self.ole.openstream(
                 streamname.encode_unicode(STRING_DATA_TABLE_NAME, True)
             ) as data_stream:
-                self.string_pool = StringPool(pool_stream, data_stream)
+                self._string_pool = StringPool(pool_stream, data_stream)
 
+    def _load_tables(self):
         with self.ole.openstream(TABLE_TABLES.stream_name()) as stream:
             rows = TABLE_TABLES._read_rows(BinaryReader(stream), self.string_pool)
             table_names = {row["Name"] for row in rows}
 
         columns = self._read_columns()
-        self.tables = {name: Table(name, columns[name]) for name in table_names}
-        self._read_validations(strict=strict)
-        self.tables[TABLE_TABLES.name] = copy.copy(TABLE_TABLES)
-        self.tables[TABLE_COLUMNS.name] = copy.copy(TABLE_COLUMNS)
+        tables = {name: Table(name, columns[name]) for name in table_names}
+        tables[TABLE_TABLES.name] = copy.copy(TABLE_TABLES)
+        tables[TABLE_COLUMNS.name] = copy.copy(TABLE_COLUMNS)
+        for table in tables.values():
+            self._bind_table(table)
+        self._tables = tables
+
+    def load_validation(self):
+        """Apply the column metadata (nullability, ranges, foreign keys,
+        categories, ...) from the _Validation table to the package's tables.
+
+        This happens when the package is opened, unless it was opened with
+        ``lazy=True``; calling it again does nothing.
+        """
+        if not self._validation_loaded:
+            self._read_validations(strict=self._strict)
+            self._validation_loaded = True
+
+    def _bind_table(self, table: Table):
+        stream_name = table.stream_name()
+        if self.ole.exists(stream_name):
+            table.bind(
+                self.string_pool,
+                self.ole.get_size(stream_name),
+                lambda: self.ole.openstream(stream_name),
+            )
+        else:
+            table.bind(self.string_pool, 0, None)
 
     def _read_columns(self):
         columns = {}
@@ -106,6 +206,7 @@ class Package:
             "ModuleConfiguration",
         }
 
+        system_tables = (TABLE_TABLES.name, TABLE_COLUMNS.name)
         with self.ole.openstream(TABLE_VALIDATION.stream_name()) as stream:
             rows = TABLE_VALIDATION._read_rows(BinaryReader(stream), self.string_pool)
             for row in rows:
@@ -120,7 +221,8 @@ class Package:
                 set_name = row["Set"]
                 description = row["Description"]
 
-                if table_name not in self.tables:
+                # _Tables and _Columns use the fixed schema from pymsi.tables.
+                if table_name not in self.tables or table_name in system_tables:
                     if table_name not in nonexistent_tables:
                         if strict:
                             print(
@@ -149,22 +251,145 @@ class Package:
                 if description is not None:
                     column.mark_description(description)
 
-    def get(self, name: str) -> Optional[Table]:
+    def get(self, name: str, columns: Optional[Sequence[str]] = None) -> Optional[Table]:
+        """Return the table called ``name``, reading its rows on first access.
+
+        If ``columns`` is given, only those columns are read from the table
+        stream and a projection holding just those columns is returned.
+        """
         if name not in self.tables:
             return None
 
         table = self.tables[name]
-        if table.rows is None:
+        if columns is not None:
+            columns = list(columns)
+        if table.needs_read(columns):
             stream_name = table.stream_name()
             if self.ole.exists(stream_name):
                 with self.ole.openstream(table.stream_name()) as stream:
                     reader = BinaryReader(stream)
-                    table.read_rows(reader, self.string_pool)
+                    table.read_rows(reader, self.string_pool, columns)
             else:
                 # Stream does not exist
                 table.read_rows(None, self.string_pool)
+        if columns is not None:
+            return table.select(*columns)
         return table
 
+    def foreign_key_columns(self, table_name: str, key_table: str) -> List[Column]:
+        """Return the columns of ``table_name`` that _Validation marks as
+        foreign keys into ``key_table``, ordered by the key column they refer to."""
+        self.load_validation()
+        table = self.tables.get(table_name)
+        if table is None:
+            return []
+        columns = [
+            column
+            for column in table.columns
+            if column.foreign_key_table is not None
+            and key_table in column.foreign_key_table.split(";")
+        ]
+        return sorted(columns, key=lambda column: column.foreign_key_index)
+
+    def _join_index(self, table: Table, column_names: Tuple[str, ...]) -> Dict:
+        cache_key = (table.name, column_names)
+        index = self._join_indexes.get(cache_key)
+        if index is None:
+            values = [table.column_values(name) for name in column_names]
+            keys = values[0] if len(values) == 1 else zip(*values)
+            index = {}
+            for row, key in enumerate(keys):
+                if key is None or (len(values) > 1 and None in key):
+                    continue
+                index.setdefault(key, []).append(row)
+            self._join_indexes[cache_key] = index
+        return index
+
+    def join(
+        self, table_name: str, key_table: str, *keys: Union[str, int], column: Optional[str] = None
+    ) -> List[Mapping]:
+        """Return the rows of ``table_name`` that refer to a row of ``key_table``.
+
+        The referring columns come from the foreign keys recorded in the
+        _Validation table, so ``package.join("File", "Component", "C")``
+        returns every File row whose ``Component_`` is ``"C"``.  Pass
+        ``column`` to name the referring column explicitly, which also works
+        for packages without validation data.  Reverse indexes are built on
+        first use and cached for the lifetime of the package.
+        """
+        table = self.get(table_name)
+        if table is None:
+            return []
+
+        if column is not None:
+            if table.column(column) is None:
+                raise KeyError(f"Column {column!r} not found in table {table_name!r}")
+            column_names = (column,)
+        else:
+            columns = self.foreign_key_columns(table_name, key_table)
+            if not columns:
+                raise ValueError(f"Table {table_name!r} has no foreign key into {key_table!r}")
+            key_indices = [c.foreign_key_index for c in columns]
+            if len(set(key_indices)) != len(key_indices):
+                names = ", ".join(repr(c.name) for c in columns)
+                raise ValueError(
+                    f"Table {table_name!r} has several foreign keys into {key_table!r} "
+                    f"({names}); pass column= to choose one"
+                )
+            column_names = tuple(c.name for c in columns)
+
+        if len(keys) != len(column_names):
+            raise TypeError(
+                f"Expected {len(column_names)} key value(s) for {column_names}, got {len(keys)}"
+            )
+        index = self._join_index(table, column_names)
+        rows = index.get(keys[0] if len(keys) == 1 else keys, [])
+        return [table.get(row) for row in rows]
+
+    def search(
+        self, pattern: Union[str, Pattern[str]], tables: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, str, Any]]:
+        """Return ``(table, column, key)`` for every string cell matching ``pattern``.
+
+        ``pattern`` is a substring or a compiled regular expression, matched
+        against the string pool.  The string columns of each table (or of the
+        named ``tables``) are then scanned for references to the matching
+        strings, so rows are never decoded.  ``key`` is the row's primary-key
+        value as taken by :meth:`Table.lookup`, or the row number for a table
+        without a primary key.
+        """
+        stringrefs = self.string_pool.search(pattern)
+        if not stringrefs:
+            return []
+
+        matches = []
+        for name in sorted(self.tables if tables is None else tables):
+            table = self.tables.get(name)
+            if table is None:
+                continue
+            if not any(column.type == "str" for column in table.columns):
+                continue
+            has_key = bool(table.primary_key_indices())
+            columns = [c.name for c in table.columns if c.type == "str" or c.primary_key]
+            projection = self.get(name, columns=columns)
+            for row, column in projection.find_string_refs(stringrefs):
+                key = projection.key_at(row) if has_key else row
+                matches.append((name, column, key))
+        return matches
+
+    def stream_view(self, stream_name: str) -> memoryview:
+        """Return the data of an OLE stream as a memoryview.
+
+        With ``use_mmap=True`` this is a view of the file mapping where
+        possible.  With olefile, which reads each stream into memory, it is a
+        view of that copy, so the data is not copied a second time.
+        """
+        stream_view = getattr(self.ole, "stream_view", None)
+        if stream_view is not None:
+            return stream_view(stream_name)
+        # The stream is not closed: its buffer stays alive as long as the view.
+        return self.ole.openstream(stream_name).getbuffer()
+
     def get_datastream_bytes(
         self, table_name: str, *primary_keys: Union[str, int]
     ) -> Optional[bytes]:
@@ -228,5 +453,7 @@ class Package:
         self.close()
 
     def close(self):
+        if isinstance(self.ole, CompoundFile):
+            self.ole.close()
         if self.file and hasattr(self.file, "close"):
             self.file.close()
@@ -40,6 +40,14 @@ class BinaryReader:
     def read_bytes(self, size) -> bytes:
         return self.stream.read(size)
 
+    def read_view(self, size) -> memoryview:
+        """Like :meth:`read_bytes`, but without copying when the stream can
+        hand out views of its data (such as :class:`pymsi.cfb.CompoundStream`)."""
+        read_view = getattr(self.stream, "read_view", None)
+        if read_view is not None:
+            return read_view(size)
+        return memoryview(self.stream.read(size))
+
     def seek(self, offset):
         self.stream.seek(offset)
 
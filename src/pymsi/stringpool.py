@@ -1,43 +1,252 @@
-from typing import List, Tuple
+import array
+import bisect
+import itertools
+import mmap
+import re
+import sys
+from typing import Iterable, List, Optional, Pattern, Tuple, Union
 
 from .codepage import CodePage
 from .reader import BinaryReader
 
 LONG_STRING_REFS_BIT = 0x8000_0000
 
+# Placeholder for strings that have not been decoded yet.
+_UNDECODED = object()
+
+# Encodings that map every byte to exactly one character.
+_SINGLE_BYTE_ENCODINGS = {
+    "cp1250",
+    "cp1251",
+    "cp1252",
+    "cp1253",
+    "cp1254",
+    "cp1255",
+    "cp1256",
+    "cp1257",
+    "cp1258",
+    "mac_roman",
+    "mac_cyrillic",
+    "ascii",
+    "latin_1",
+    "iso8859_2",
+    "iso8859_3",
+    "iso8859_4",
+    "iso8859_5",
+    "iso8859_6",
+    "iso8859_7",
+    "iso8859_8",
+}
+
+
+def _read_all(source) -> memoryview:
+    """Return the rest of a stream, or a bytes-like object, as a memoryview."""
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return memoryview(source)
+    reader = BinaryReader(source)
+    return reader.read_view(reader.size() - reader.tell())
+
 
 class StringPool:
     def __init__(self, pool_stream, data_stream):
-        pool_reader = BinaryReader(pool_stream)
-        data_reader = BinaryReader(data_stream)
+        """Read the pool from the _StringPool and _StringData streams.
 
-        codepage_id = pool_reader.read_u32_le()
+        Either may also be given as a bytes-like object, such as a view
+        returned by :meth:`pymsi.cfb.CompoundFile.stream_view`; the string
+        data is then used in place instead of being copied.
+        """
+        pool = _read_all(pool_stream)
+        codepage_id = int.from_bytes(pool[:4], "little")
         self.long_string_refs = (codepage_id & LONG_STRING_REFS_BIT) != 0
         codepage_id = codepage_id & ~LONG_STRING_REFS_BIT
         self.codepage = CodePage(codepage_id)
 
-        self.strings: List[Tuple[str, int]] = []
-        while not pool_reader.iseof():
-            length = pool_reader.read_u16_le()
-            refcount = pool_reader.read_u16_le()
-            if length == 0 and refcount > 0:
-                length = pool_reader.read_u32_le()
-            self.strings.append((self.codepage.decode(data_reader.read_bytes(length)), refcount))
+        # Only the layout of the pool is read up front: each string's offset
+        # into the data stream and its refcount.  Strings are decoded the
+        # first time they are looked up.
+        lengths, self._refcounts = self._read_entries(pool[4:])
+        self._offsets = array.array("q", itertools.accumulate(lengths, initial=0))
+        self._data = _read_all(data_stream)[: self._offsets[-1]]
+        # Reference 0 is the null string; reference n is string n - 1.
+        self._by_ref: List = [_UNDECODED] * (len(lengths) + 1)
+        self._by_ref[0] = None
+        self._num_undecoded = len(lengths)
+        self._text: Optional[str] = None
+
+    @staticmethod
+    def _read_entries(pool: memoryview) -> Tuple[array.array, array.array]:
+        """Split the pool stream into string lengths and refcounts."""
+        if len(pool) % 4 != 0:
+            raise ValueError("String pool length is not a multiple of 4")
+        entries = array.array("H")
+        entries.frombytes(pool)
+        if sys.byteorder == "big":
+            entries.byteswap()
+        lengths = entries[0::2]
+        refcounts = entries[1::2]
+        if 0 not in lengths:
+            return lengths, refcounts
+
+        # A string longer than 0xFFFF bytes has a zero length and a non-zero
+        # refcount, and its real length follows as a 32-bit value in place of
+        # the next entry.  Such strings are rare, so find them by searching
+        # for zero lengths and rebuild the arrays only if there are any.
+        long_strings = []
+        entry = lengths.index(0)
+        while True:
+            if refcounts[entry] > 0 and entry + 1 < len(lengths):
+                long_strings.append(entry)
+                entry += 1
+            try:
+                entry = lengths.index(0, entry + 1)
+            except ValueError:
+                break
+        if not long_strings:
+            return lengths, refcounts
+        long_lengths = array.array("q", lengths)
+        for entry in long_strings:
+            long_lengths[entry] = lengths[entry + 1] | refcounts[entry + 1] << 16
+        skipped = set(entry + 1 for entry in long_strings)
+        keep = [entry for entry in range(len(lengths)) if entry not in skipped]
+        return (
+            array.array("q", (long_lengths[entry] for entry in keep)),
+            array.array("H", (refcounts[entry] for entry in keep)),
+        )
+
+    def _decode(self, stringref: int) -> str:
+        self._decode_all([stringref])
+        return self._by_ref[stringref]
+
+    def _decode_data(self) -> Optional[str]:
+        """Decode the whole data stream at once if each byte is one character.
+
+        Slicing that text by byte offsets then gives the same strings as
+        decoding each one separately.
+        """
+        if self._text is None:
+            self._text = ""
+            encoding = self.codepage.encoding
+            if encoding not in _SINGLE_BYTE_ENCODINGS:
+                # Any other supported code page reads ASCII as ASCII, except
+                # UTF-7 which gives "+" a special meaning.
+                encoding = "ascii" if self.codepage.id != 65000 else None
+            if encoding is not None:
+                try:
+                    self._text = str(self._data, encoding)
+                except UnicodeDecodeError:
+                    pass
+        return self._text or None
+
+    def _decode_all(self, stringrefs: List[int]):
+        by_ref, offsets = self._by_ref, self._offsets
+        # Decoding many strings one at a time is dominated by per-call
+        # overhead, so large batches slice a single decode of the data.
+        text = self._decode_data() if len(stringrefs) * 16 >= len(by_ref) else None
+        if text is not None:
+            for stringref in stringrefs:
+                by_ref[stringref] = text[offsets[stringref - 1] : offsets[stringref]]
+        else:
+            data, decode = self._data, self.codepage.decode
+            for stringref in stringrefs:
+                by_ref[stringref] = decode(bytes(data[offsets[stringref - 1] : offsets[stringref]]))
+        self._num_undecoded -= len(stringrefs)
+
+    def __len__(self) -> int:
+        return len(self._refcounts)
 
     def __getitem__(self, stringref: int):
-        if 0 > stringref or stringref >= len(self.strings):
+        if 0 > stringref or stringref >= len(self._refcounts):
             raise IndexError("Index out of range")
-        return self.strings[stringref][0]
+        string = self._by_ref[stringref + 1]
+        if string is _UNDECODED:
+            string = self._decode(stringref + 1)
+        return string
 
     def refcount(self, stringref: int):
-        if 0 > stringref or stringref >= len(self.strings):
+        if 0 > stringref or stringref >= len(self._refcounts):
             raise IndexError("Index out of range")
-        return self.strings[stringref][1]
+        return self._refcounts[stringref]
+
+    @property
+    def strings(self) -> List[Tuple[str, int]]:
+        """Every string in the pool with its refcount; decodes the whole pool."""
+        return [(self[index], self._refcounts[index]) for index in range(len(self))]
 
-    def read_string(self, reader: BinaryReader):
-        idx = reader.read_u16_le()
-        if self.long_string_refs:
-            idx = reader.read_u8() << 16 | idx
-        if idx == 0:
+    def resolve(self, stringref: int) -> Optional[str]:
+        """Look up a raw string reference as stored in a table; ``0`` is ``None``."""
+        if stringref == 0:
             return None
-        return self[idx - 1]
+        return self[stringref - 1]
+
+    def resolve_all(self, stringrefs: Iterable[int]) -> List[Optional[str]]:
+        """Look up many raw string references at once; ``0`` maps to ``None``."""
+        by_ref = self._by_ref
+        if self._num_undecoded:
+            if not isinstance(stringrefs, (array.array, list, tuple)):
+                stringrefs = list(stringrefs)
+            self._decode_all(
+                [
+                    stringref
+                    for stringref in set(stringrefs)
+                    if 0 <= stringref < len(by_ref) and by_ref[stringref] is _UNDECODED
+                ]
+            )
+        try:
+            return [by_ref[idx] for idx in stringrefs]
+        except IndexError:
+            raise IndexError("Index out of range") from None
+
+    def find(self, string: str) -> List[int]:
+        """Return the raw references (as stored in tables) of every entry equal
+        to ``string``, in ascending order; empty if the pool does not hold it.
+
+        ``string`` is encoded and its bytes are searched for in the string
+        data, so only the entries that match are decoded.
+        """
+        by_ref, offsets = self._by_ref, self._offsets
+        if self.codepage.id == 65000:
+            # UTF-7 can encode one string in several ways; compare decoded.
+            strings = self.resolve_all(range(1, len(by_ref)))
+            return [ref for ref, value in enumerate(strings, 1) if value == string]
+
+        # The neutral code page decodes with the first of these that fits.
+        encodings = [self.codepage.encoding or "utf-8"]
+        if self.codepage.encoding is None:
+            encodings += ["cp1252", "latin_1"]
+        candidates = set()
+        for encoding in encodings:
+            try:
+                needle = string.encode(encoding)
+            except UnicodeEncodeError:
+                continue
+            if not needle:
+                candidates.update(
+                    ref for ref in range(1, len(by_ref)) if offsets[ref] == offsets[ref - 1]
+                )
+                continue
+            # A lookahead also finds matches that overlap an earlier one.
+            for match in re.finditer(b"(?=" + re.escape(needle) + b")", self._data):
+                start = match.start()
+                ref = bisect.bisect_left(offsets, start)
+                # Skip empty strings that start at the same offset.
+                while ref < len(offsets) - 1 and offsets[ref] == start:
+                    if offsets[ref + 1] - start == len(needle):
+                        candidates.add(ref + 1)
+                        break
+                    if offsets[ref + 1] != start:
+                        break
+                    ref += 1
+        return sorted(ref for ref in candidates if self.resolve(ref) == string)
+
+    def search(self, pattern: Union[str, Pattern[str]]) -> List[int]:
+        """Return the raw references of every string containing ``pattern``.
+
+        A ``str`` pattern is matched as a plain substring; a compiled regular
+        expression is matched with :meth:`re.Pattern.search`.
+        """
+        strings = self.resolve_all(range(1, len(self._by_ref)))
+        if isinstance(pattern, str):
+            return [ref for ref, string in enumerate(strings, 1) if pattern in string]
+        if isinstance(pattern, re.Pattern):
+            return [ref for ref, string in enumerate(strings, 1) if pattern.search(string)]
+        raise TypeError("pattern must be a string or a compiled regular expression")
@@ -1,17 +1,125 @@
+import array
 import copy
-from typing import Dict, List, Optional
+import itertools
+import operator
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from pymsi import streamname
 from pymsi.column import Column
 from pymsi.reader import BinaryReader
 from pymsi.stringpool import StringPool
 
+# Number of rows decoded together when iterating over a table.  Decoding a
+# column slice at a time is much faster than decoding cell by cell, and the
+# chunk bounds the size of the temporary lists this needs.
+_ROW_CHUNK = 4096
+
+
+class Row(Mapping):
+    """Read-only mapping of column names to the decoded values of one row."""
+
+    __slots__ = ("_positions", "_values")
+
+    def __init__(self, positions: Dict[str, int], values: tuple):
+        self._positions = positions
+        self._values = values
+
+    def __getitem__(self, column_name: str):
+        return self._values[self._positions[column_name]]
+
+    def __contains__(self, column_name) -> bool:
+        return column_name in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self):
+        return f"Row({dict(self)!r})"
+
+
+class _TableRows(Sequence):
+    """Sequence view over a table whose rows are materialized on access."""
+
+    def __init__(self, table: "Table"):
+        self._table = table
+
+    def __getitem__(self, row):
+        return self._table[row]
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Sequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
 
 class Table:
     def __init__(self, name: str, columns: List[Column]):
         self.name = name
         self.columns = columns
-        self.rows = None
+        # Decoded tables keep one array of raw cells per column: string pool
+        # references for string columns and stored values for integer columns.
+        # Rows are only built when they are accessed.
+        self._cells: Optional[List[array.array]] = None
+        self._num_rows = 0
+        self._string_pool: Optional[StringPool] = None
+        self._positions: Optional[Dict[str, int]] = None
+        # Rows assigned directly (e.g. by hand-built tables) are kept as given.
+        self._rows: Optional[List[Mapping]] = None
+        # Primary-key value (or tuple of values) -> row number, built on demand.
+        self._key_index: Optional[Dict] = None
+        # Whether the raw key cells are sorted, checked by the first search.
+        self._keys_sorted: Optional[bool] = None
+        # Set by bind() so the table can be sized and sampled before reading.
+        self._stream_size: Optional[int] = None
+        self._open_stream: Optional[Callable[[], Any]] = None
+        # The bound stream's data, kept after the first single-row read.
+        self._view: Optional[memoryview] = None
+
+    @property
+    def rows(self) -> Optional[Sequence]:
+        if self._cells is not None:
+            if not self._has_cells(range(len(self.columns))):
+                return None
+            return _TableRows(self)
+        return self._rows
+
+    @rows.setter
+    def rows(self, rows: Optional[List[Mapping]]):
+        self._rows = rows
+        self._cells = None
+        self._num_rows = 0
+        self._string_pool = None
+        self._key_index = None
+        self._keys_sorted = None
+        self._view = None
+
+    def bind(
+        self,
+        string_pool: StringPool,
+        stream_size: int,
+        open_stream: Optional[Callable[[], Any]],
+    ):
+        """Attach the table's stream without reading it.
+
+        ``open_stream`` returns a new stream object (usable as a context
+        manager) positioned at the start of the table data, or is ``None``
+        when the table has no stream.  Bound tables know their length and
+        support :meth:`row_at` before :meth:`read_rows` is called.
+        """
+        self._string_pool = string_pool
+        self._stream_size = stream_size
+        self._open_stream = open_stream
+        self._view = None
 
     def stream_name(self) -> str:
         return streamname.encode_unicode(self.name, True)
@@ -31,60 +139,474 @@ class Table:
     def primary_key_indices(self) -> List[int]:
         return [index for index, column in enumerate(self.columns) if column.primary_key]
 
-    def _read_rows(self, reader: BinaryReader, string_pool: StringPool) -> List[Dict]:
-        data_len = reader.size() - reader.tell()
-        row_size = sum([c.width(string_pool.long_string_refs) for c in self.columns])
+    def _row_count(self, data_len: int, long_string_refs: bool) -> int:
+        row_size = sum(c.width(long_string_refs) for c in self.columns)
         num_rows = 0 if row_size == 0 else data_len // row_size
-        if data_len % row_size != 0:
+        if row_size and data_len % row_size != 0:
             raise ValueError("Data length is not a multiple of row size")
         if num_rows > 0x10_0000:
             raise ValueError("Too many rows in table, maximum is 65536")
+        return num_rows
 
-        rows = [[] for _ in range(num_rows)]
-        for col in self.columns:
-            for row in range(num_rows):
-                rows[row].append(col.read_value(reader, string_pool))
-
-        rows = [dict(zip([col.name for col in self.columns], row)) for row in rows]
-        return rows
+    def _read_cells(
+        self,
+        reader: BinaryReader,
+        string_pool: StringPool,
+        columns: Optional[Sequence[int]] = None,
+    ) -> List[Optional[array.array]]:
+        start = reader.tell()
+        data_len = reader.size() - start
+        long_string_refs = string_pool.long_string_refs
+        widths = [c.width(long_string_refs) for c in self.columns]
+        num_rows = self._row_count(data_len, long_string_refs)
 
-    def read_rows(self, reader: Optional[BinaryReader], string_pool: StringPool) -> List[Dict]:
-        if self.rows is None:
-            if reader is None:
-                self.rows = []
+        # Tables are stored column-major: every cell of the first column, then
+        # every cell of the second column, and so on.  Each column is unpacked
+        # from its own slice, and columns that were not asked for are skipped
+        # without being read.
+        if columns is None:
+            data = reader.read_view(data_len)
+            start = 0
+        cells: List[Optional[array.array]] = []
+        offset = 0
+        for index, (col, width) in enumerate(zip(self.columns, widths)):
+            end = offset + width * num_rows
+            if columns is None:
+                cells.append(col.read_cells(data[offset:end], long_string_refs))
+            elif index in columns:
+                reader.seek(start + offset)
+                view = reader.read_view(end - offset)
+                cells.append(col.read_cells(view, long_string_refs))
             else:
-                self.rows = self._read_rows(reader, string_pool)
+                cells.append(None)
+            offset = end
+        return cells
+
+    def _read_rows(self, reader: BinaryReader, string_pool: StringPool) -> List[Dict]:
+        cells = self._read_cells(reader, string_pool)
+        values = [col.decode_cells(c, string_pool) for col, c in zip(self.columns, cells)]
+        names = [col.name for col in self.columns]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def _require_columns(self, column_names: Iterable[str]) -> List[int]:
+        indices = []
+        for name in column_names:
+            index = self.column_index(name)
+            if index is None:
+                raise KeyError(f"Column {name!r} not found in table {self.name!r}")
+            indices.append(index)
+        return indices
+
+    def _has_cells(self, indices: Iterable[int]) -> bool:
+        return self._cells is not None and all(self._cells[index] is not None for index in indices)
+
+    def needs_read(self, columns: Optional[Iterable[str]] = None) -> bool:
+        """Return whether :meth:`read_rows` still has to read ``columns``
+        (or every column) from the table stream."""
+        if self._rows is not None:
+            return False
+        if columns is None:
+            return not self._has_cells(range(len(self.columns)))
+        return not self._has_cells(self._require_columns(columns))
+
+    def read_rows(
+        self,
+        reader: Optional[BinaryReader],
+        string_pool: StringPool,
+        columns: Optional[Iterable[str]] = None,
+    ) -> Optional[Sequence]:
+        """Read the table's cells from ``reader``.
+
+        With ``columns``, only those columns are read; the rest of the stream
+        is skipped and can be read by a later call.
+        """
+        if self._rows is not None:
+            return self.rows
+        if reader is None:
+            self._rows = []
+            return self.rows
+
+        if columns is None:
+            wanted = list(range(len(self.columns)))
+        else:
+            wanted = self._require_columns(columns)
+        if self._cells is None:
+            missing = None if columns is None else wanted
+        else:
+            missing = [index for index in wanted if self._cells[index] is None]
+            if not missing:
+                return self.rows
+
+        num_rows = self._row_count(reader.size() - reader.tell(), string_pool.long_string_refs)
+        cells = self._read_cells(reader, string_pool, missing)
+        if self._cells is None:
+            self._cells = cells
+            self._num_rows = num_rows
+            self._string_pool = string_pool
+        else:
+            for index in missing:
+                self._cells[index] = cells[index]
+        if self._has_cells(range(len(self.columns))):
+            # Single cells are read from the cells from now on.
+            self._view = None
         return self.rows
 
-    def get(self, row: int, localize: bool = False) -> Dict:
-        if self.rows is None:
-            raise ValueError("Rows not read yet, call read_rows() first")
-        row_data = self.rows[row]
-        if localize:
-            row_data = copy.copy(row_data)
-            for column in self.columns:
-                if column.localizable:
-                    row_data[column.name] = Column.localize(row_data[column.name])
-        return row_data
+    def select(self, *column_names: str) -> "Table":
+        """Return a table holding only ``column_names``, in the given order.
+
+        The selected columns must already be read; their cells are shared
+        with this table rather than copied.
+        """
+        indices = self._require_columns(column_names)
+        projection = Table(self.name, [self.columns[index] for index in indices])
+        if self._cells is not None:
+            if not self._has_cells(indices):
+                raise ValueError("Columns not read yet, call read_rows() first")
+            projection._cells = [self._cells[index] for index in indices]
+            projection._num_rows = self._num_rows
+            projection._string_pool = self._string_pool
+        elif self._rows is not None:
+            projection._rows = [{name: row[name] for name in column_names} for row in self._rows]
+        return projection
+
+    def _row_positions(self) -> Dict[str, int]:
+        if self._positions is None:
+            self._positions = {column.name: index for index, column in enumerate(self.columns)}
+        return self._positions
+
+    def _decode_row(self, row: int, localize: bool) -> Row:
+        string_pool = self._string_pool
+        values = []
+        for column, cells in zip(self.columns, self._cells):
+            value = column.decode_cell(cells[row], string_pool)
+            if localize and column.localizable:
+                value = Column.localize(value)
+            values.append(value)
+        return Row(self._row_positions(), tuple(values))
+
+    def _iter_decoded(self, localize: bool) -> Iterator[Row]:
+        positions = self._row_positions()
+        string_pool = self._string_pool
+        for start in range(0, self._num_rows, _ROW_CHUNK):
+            end = start + _ROW_CHUNK
+            values = []
+            for column, cells in zip(self.columns, self._cells):
+                decoded = column.decode_cells(cells[start:end], string_pool)
+                if localize and column.localizable:
+                    decoded = [Column.localize(value) for value in decoded]
+                values.append(decoded)
+            for row in zip(*values):
+                yield Row(positions, row)
+
+    def column_values(self, column_name: str) -> List:
+        """Return every value of one column, in row order.
 
-    def iter(self, localize: bool = False):
+        A bound table reads just that column if it is not read yet.
+        """
+        index = self._require_columns([column_name])[0]
+        self._load_columns([index])
+        return self._column_values(index)
+
+    def _column_values(self, index: int) -> List:
+        column = self.columns[index]
+        if self._cells is not None:
+            return column.decode_cells(self._cells[index], self._string_pool)
+        return [row[column.name] for row in self._rows]
+
+    def _load_columns(self, indices: List[int]):
+        """Make sure ``indices`` are read, reading them from the bound stream."""
+        if self._rows is not None or self._has_cells(indices):
+            return
+        if self._open_stream is None:
+            if self._stream_size == 0:
+                self.read_rows(None, self._string_pool)
+                return
+            self._check_read()
+        names = [self.columns[index].name for index in indices]
+        with self._open_stream() as stream:
+            self.read_rows(BinaryReader(stream), self._string_pool, names)
+
+    def _stream_view(self) -> Optional[memoryview]:
+        """Return a view of the bound stream for reading single cells.
+
+        A stream that hands out zero-copy views (such as
+        :class:`pymsi.cfb.CompoundStream`) is kept as a view until every
+        column is read.  Any other stream would be copied, so its missing
+        columns are read instead and ``None`` is returned.
+        """
+        if self._view is None:
+            if self._open_stream is None:
+                raise ValueError(
+                    f"Table {self.name!r} is not bound to a stream, call read_rows() first"
+                )
+            with self._open_stream() as stream:
+                reader = BinaryReader(stream)
+                if getattr(stream, "read_view", None) is None:
+                    cells = self._cells or [None] * len(self.columns)
+                    names = [
+                        column.name
+                        for column, column_cells in zip(self.columns, cells)
+                        if column_cells is None
+                    ]
+                    self.read_rows(reader, self._string_pool, names)
+                    return None
+                self._view = reader.read_view(reader.size() - reader.tell())
+        return self._view
+
+    def _primary_key_index(self) -> Dict:
+        if self._key_index is None:
+            indices = self.primary_key_indices()
+            if not indices:
+                raise ValueError(f"Table {self.name!r} has no primary-key columns")
+            # Only the key columns are needed; a bound table reads just those.
+            self._load_columns(indices)
+            if len(indices) == 1:
+                keys = self._column_values(indices[0])
+            else:
+                keys = list(zip(*(self._column_values(index) for index in indices)))
+            # Build from the end so the first row wins if a key is duplicated.
+            self._key_index = dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+        return self._key_index
+
+    def _check_key_count(self, keys: tuple) -> int:
+        num_keys = len(self.primary_key_indices())
+        if len(keys) != num_keys:
+            raise TypeError(
+                f"Table {self.name!r} has {num_keys} primary-key column(s), got {len(keys)} value(s)"
+            )
+        return num_keys
+
+    def _key_row(self, keys: tuple) -> Optional[int]:
+        index = self._primary_key_index()
+        num_keys = self._check_key_count(keys)
+        return index.get(keys[0] if num_keys == 1 else keys)
+
+    def _search_key_row(self, keys: tuple) -> Optional[int]:
+        """Binary-search the raw primary-key cells for ``keys``.
+
+        Windows Installer stores rows sorted by their raw key cells (string
+        pool references for strings, stored values for integers), so the row
+        can be found from the key cells alone, without decoding the key
+        strings or building the primary-key index.  The order is checked once
+        per table; a table whose rows are not sorted uses the index instead.
+        """
+        indices = self.primary_key_indices()
+        if not indices:
+            raise ValueError(f"Table {self.name!r} has no primary-key columns")
+        self._check_key_count(keys)
+        if self._rows is not None:
+            return self._key_row(keys)
+
+        string_pool = self._string_pool
+        candidates = []
+        for index, key in zip(indices, keys):
+            cells = self.columns[index].encode_cells(key, string_pool)
+            if not cells:
+                return None
+            candidates.append(cells)
+
+        if not self._raw_keys_sorted(indices):
+            return self._key_row(keys)
+        key_cells = [self._cells[index] for index in indices]
+
+        def probe(row: int) -> tuple:
+            return tuple(cells[row] for cells in key_cells)
+
+        # A string the pool holds more than once can be stored as any copy.
+        for target in itertools.product(*candidates):
+            row = self._bisect_rows(target, self._num_rows, probe)
+            if row is not None:
+                return row
+        return None
+
+    def _raw_keys_sorted(self, indices: List[int]) -> bool:
+        """Return whether the rows are in strictly ascending raw key order."""
+        if self._keys_sorted is None:
+            self._load_columns(indices)
+            key_cells = [self._cells[index] for index in indices]
+            keys = key_cells[0] if len(key_cells) == 1 else list(zip(*key_cells))
+            self._keys_sorted = all(map(operator.lt, keys, itertools.islice(keys, 1, None)))
+        return self._keys_sorted
+
+    @staticmethod
+    def _bisect_rows(target: tuple, num_rows: int, probe: Callable[[int], tuple]) -> Optional[int]:
+        """Return the row holding ``target`` among rows sorted by ``probe``."""
+        lo, hi = 0, num_rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if probe(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < num_rows and probe(lo) == target:
+            return lo
+        return None
+
+    def lookup(
+        self, *keys, localize: bool = False, binary_search: bool = False
+    ) -> Optional[Mapping]:
+        """Return the row whose primary-key columns equal ``keys``, or ``None``.
+
+        Keys are given in column order, e.g. ``table.lookup("Table", 3)`` for a
+        table keyed on a string and an integer column.  The first lookup
+        builds an index of the key columns; with ``binary_search=True`` the
+        raw key cells are binary-searched instead, which reads only the key
+        columns and decodes none of their strings.
+        """
+        if binary_search:
+            row = self._search_key_row(keys)
+        else:
+            row = self._key_row(keys)
+        if row is None:
+            return None
+        return self.row_at(row, localize=localize)
+
+    def contains(self, *keys, binary_search: bool = False) -> bool:
+        """Return whether a row with the given primary-key values exists."""
+        if binary_search:
+            return self._search_key_row(keys) is not None
+        return self._key_row(keys) is not None
+
+    def key_at(self, row: int):
+        """Return the primary-key value of ``row`` in the form :meth:`lookup`
+        takes: a single value, or a tuple for a composite key."""
+        indices = self.primary_key_indices()
+        if not indices:
+            raise ValueError(f"Table {self.name!r} has no primary-key columns")
+        self._load_columns(indices)
+        if self._cells is not None:
+            values = [
+                self.columns[index].decode_cell(self._cells[index][row], self._string_pool)
+                for index in indices
+            ]
+        else:
+            values = [self._rows[row][self.columns[index].name] for index in indices]
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def find_string_refs(self, stringrefs: Collection[int]) -> List[Tuple[int, str]]:
+        """Return ``(row, column name)`` for every string cell holding one of
+        the raw string pool references in ``stringrefs``.
+
+        Cells are compared as stored, so nothing is decoded; a bound table
+        reads only its string columns.  Tables whose rows were assigned
+        directly hold no references and never match.
+        """
+        indices = [index for index, column in enumerate(self.columns) if column.type == "str"]
+        if not indices or not stringrefs:
+            return []
+        self._load_columns(indices)
+        if self._cells is None:
+            return []
+
+        stringrefs = set(stringrefs)
+        matches = []
+        for index in indices:
+            cells = self._cells[index]
+            if len(stringrefs) <= 8:
+                # A few references are found fastest by searching the raw
+                # cell bytes, which avoids creating an object per cell.
+                data = cells.tobytes()
+                itemsize = cells.itemsize
+                for stringref in stringrefs:
+                    if not 0 <= stringref < 1 << (8 * itemsize):
+                        continue
+                    needle = array.array(cells.typecode, [stringref]).tobytes()
+                    position = data.find(needle)
+                    while position != -1:
+                        if position % itemsize == 0:
+                            matches.append((position // itemsize, index))
+                        position = data.find(needle, position + 1)
+            else:
+                matches.extend((row, index) for row, cell in enumerate(cells) if cell in stringrefs)
+        matches.sort()
+        return [(row, self.columns[index].name) for row, index in matches]
+
+    def _check_read(self):
         if self.rows is None:
             raise ValueError("Rows not read yet, call read_rows() first")
+
+    def get(self, row: int, localize: bool = False) -> Mapping:
+        self._check_read()
+        if self._cells is None:
+            row_data = self._rows[row]
+            if localize:
+                row_data = copy.copy(row_data)
+                for column in self.columns:
+                    if column.localizable:
+                        row_data[column.name] = Column.localize(row_data[column.name])
+            return row_data
+
+        if row < 0:
+            row += self._num_rows
+        if not 0 <= row < self._num_rows:
+            raise IndexError("Row index out of range")
+        return self._decode_row(row, localize)
+
+    def iter(self, localize: bool = False) -> Iterator[Mapping]:
+        self._check_read()
+        if self._cells is not None:
+            return self._iter_decoded(localize)
         if localize:
-            return (self.get(row, localize=True) for row in range(len(self.rows)))
-        return iter(self.rows)
+            return (self.get(row, localize=True) for row in range(len(self._rows)))
+        return iter(self._rows)
 
-    def __getitem__(self, row: int) -> Dict:
-        if self.rows is None:
-            raise ValueError("Rows not read yet, call read_rows() first")
-        return self.rows[row]
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[index] for index in range(*row.indices(len(self)))]
+        return self.get(row)
 
-    def __iter__(self):
-        if self.rows is None:
+    def __iter__(self) -> Iterator[Mapping]:
+        return self.iter()
+
+    def row_at(self, row: int, localize: bool = False) -> Mapping:
+        """Return one row, reading only its cells if the table is not read yet.
+
+        Every cell sits at a fixed offset in the column-major stream, so a
+        stream that can be viewed without copying is opened once and its
+        cells read in place.  Other streams are read into cells on the first
+        call, so fetching rows one at a time does not re-read the stream.
+        """
+        if self.rows is not None:
+            return self.get(row, localize=localize)
+        if self._open_stream is None and self._cells is None:
+            if self._stream_size == 0:
+                raise IndexError("Row index out of range")
             raise ValueError("Rows not read yet, call read_rows() first")
-        return iter(self.rows)
+
+        num_rows = len(self)
+        if row < 0:
+            row += num_rows
+        if not 0 <= row < num_rows:
+            raise IndexError("Row index out of range")
+        view = self._stream_view()
+        if view is None:
+            return self.get(row, localize=localize)
+
+        string_pool = self._string_pool
+        long_string_refs = string_pool.long_string_refs
+        cells = self._cells or [None] * len(self.columns)
+        values = []
+        offset = 0
+        for column, column_cells in zip(self.columns, cells):
+            width = column.width(long_string_refs)
+            if column_cells is not None:
+                cell = column_cells[row]
+            else:
+                start = offset + row * width
+                data = view[start : start + width]
+                cell = column.read_cells(data, long_string_refs)[0]
+            value = column.decode_cell(cell, string_pool)
+            if localize and column.localizable:
+                value = Column.localize(value)
+            values.append(value)
+            offset += width * num_rows
+        return Row(self._row_positions(), tuple(values))
 
     def __len__(self):
-        if self.rows is None:
-            raise ValueError("Rows not read yet, call read_rows() first")
-        return len(self.rows)
+        if self._cells is not None:
+            return self._num_rows
+        if self._rows is not None:
+            return len(self._rows)
+        if self._stream_size is not None:
+            return self._row_count(self._stream_size, self._string_pool.long_string_refs)
+        raise ValueError("Rows not read yet, call read_rows() first")
@@ -9,10 +9,10 @@ from typing import NamedTuple, Optional, Iterable
 from enum import IntFlag, IntEnum
 from datetime import date, time, datetime
 
+import threading
 import zlib
 
 from .structures import Struct, StructReader
-from . import chunks
 from .lzx import LzxDecoder
 
 
@@ -34,13 +34,46 @@ class CabVolumeCorrupt(ValueError):
 
 
 def cab_data_checksum(content: memoryview, checksum: int = 0) -> int:
-    for chunk in chunks.unpack(content, 4):
-        checksum ^= chunk
+    # The checksum XORs together all little endian 32-bit words of the data. Read as a single
+    # integer, the words are folded in half until one remains, which takes a logarithmic number of
+    # big integer operations instead of one Python level XOR per word.
+    size = len(content) & ~3
+    words = int.from_bytes(content[:size], 'little')
+    width = size * 8
+    while width > 32:
+        width = (width + 32) // 64 * 32
+        words = (words & ((1 << width) - 1)) ^ (words >> width)
+    checksum ^= words
     if k := len(content) % 4:
         checksum ^= int.from_bytes(content[-k:], 'big')
     return checksum
 
 
+_lzx_decoders = threading.local()
+
+
+def _get_lzx_decoder(num_dict_bits: int) -> LzxDecoder:
+    """
+    Return an LZX decoder for the given window size that is ready to decompress a new folder.
+    Each thread keeps one decoder per window size, along with its window of up to 2 MB, so that
+    extracting many folders does not allocate a new window and new tables for each of them.
+    """
+    try:
+        pool: dict[int, LzxDecoder] = _lzx_decoders.pool
+    except AttributeError:
+        pool = _lzx_decoders.pool = {}
+    lzx = pool.get(num_dict_bits)
+    if lzx is None:
+        lzx = LzxDecoder(False)
+        lzx.set_params(num_dict_bits)
+        lzx.set_external_window(bytearray(1 << num_dict_bits), num_dict_bits)
+        pool[num_dict_bits] = lzx
+    # Without history, the next call to decompress starts over at the beginning of the window
+    # and resets the trees, repeated offsets and E8 translation of the previous folder.
+    lzx.keep_history = False
+    return lzx
+
+
 class CabFlags(IntFlag):
     HasPrev = 1
     HasNext = 2
@@ -71,7 +104,14 @@ class NFolderIndex(IntFlag):
 
 class CabFolder(Struct):
 
-    def __init__(self, reader: StructReader[memoryview], parent: CabDisk, compute_checksums: bool, no_magic: bool):
+    def __init__(
+        self,
+        reader: StructReader[memoryview],
+        parent: CabDisk,
+        compute_checksums: bool,
+        no_magic: bool,
+        verify: bool = False,
+    ):
         start = reader.u32()
         count = reader.u16()
         if no_magic:
@@ -79,17 +119,51 @@ class CabFolder(Struct):
         self.method = (reader.u8(), reader.u8())
         self.compression = CabMethod(self.method[0] & 0xF)
         reader.seekrel(parent.skip_per_fldr)
-        with reader.detour(start):
-            self.blocks = [CabCompressedBlock(reader, parent, compute_checksums) for _ in range(count)]
+        # Only the location of the CFDATA chain is recorded here; the blocks are parsed when the
+        # folder is first decompressed or checked, so that listing the files of a cabinet only
+        # reads its headers. A folder that continues on later disks has one chain per disk.
+        self._chains: list[tuple[CabDisk, int, int]] = [(parent, start, count)]
+        self._blocks: list[CabCompressedBlock] = []
+        self._compute_checksums = compute_checksums
+        self._verify = verify
         self.decompressed = None
 
+    @property
+    def blocks(self) -> list[CabCompressedBlock]:
+        if self._chains:
+            for disk, start, count in self._chains:
+                # Folders may be decompressed from several threads, so each walk uses its own
+                # reader rather than moving the cursor of the disk's reader.
+                reader = StructReader(disk._reader.getbuffer())
+                reader.seekset(start)
+                self._blocks.extend(
+                    CabCompressedBlock(reader, disk, self._compute_checksums) for _ in range(count))
+            self._chains.clear()
+        return self._blocks
+
+    def _append_blocks(self, folder: CabFolder):
+        if self._blocks or folder._blocks:
+            self.blocks.extend(folder.blocks)
+        else:
+            self._chains.extend(folder._chains)
+        folder._chains.clear()
+        folder._blocks = []
+
     def __repr__(self):
-        return F'<fldr:{self.compression.name}({self.method[1]}):{len(self.blocks)}>'
+        count = len(self._blocks) + sum(count for _, _, count in self._chains)
+        return F'<fldr:{self.compression.name}({self.method[1]}):{count}>'
 
     def decompress(self):
         if self.decompressed is not None:
             return memoryview(self.decompressed)
 
+        if self._verify:
+            for b, block in enumerate(self.blocks):
+                if not block.verify():
+                    raise CabVolumeCorrupt(
+                        F'Incorrect checksum in block {b} of {self!r}; provided value was '
+                        F'{block.provided_checksum:08X}, computed value {block.computed_checksum:08X}.')
+
         dst = bytearray()
         cm = self.compression
         it = iter(self.blocks)
@@ -110,8 +184,7 @@ class CabFolder(Struct):
                 else:
                     dst.extend(zdict)
         elif cm == CabMethod.LZX:
-            lzx = LzxDecoder(False)
-            lzx.set_params_and_alloc(self.method[1])
+            lzx = _get_lzx_decoder(self.method[1])
             for block in it:
                 if size := block.decompressed_size:
                     data = block.data
@@ -137,13 +210,9 @@ class CabFile(Struct):
     folder: Optional[CabFolder]
 
     def __init__(self, reader: StructReader[memoryview]):
-        self.size = reader.u32()
-        self.offset = reader.u32()
-        self._index = reader.u16()
+        self.size, self.offset, self._index, d, t, attributes = reader.read_struct('<IIHHHH')
         self.folder = None
         self.end = self.offset + self.size
-        d = reader.u16()
-        t = reader.u16()
         s = (t & 0x1F) << 1
 
         try:
@@ -165,7 +234,7 @@ class CabFile(Struct):
             self.time = t = None
 
         self.timestamp = datetime.combine(d, t) if d and t else None
-        self.attributes = CabAttr(reader.u16())
+        self.attributes = CabAttr(attributes)
         self.name = reader.read_c_string(self.codec)
 
     def __repr__(self):
@@ -216,8 +285,30 @@ class CabCompressedBlock(Struct):
         size = reader.u16()
         self.decompressed_size = reader.u16()
         reader.seekrel(parent.skip_per_data)
-        self.data = data = reader.read_exactly(size)
-        self.computed_checksum = cab_data_checksum(data, seed) if compute_checksums else None
+        # This is a view of the cabinet; the checksum is only computed when it is requested so
+        # that the block data is not touched before its folder is decompressed.
+        self.data = reader.read_exactly(size)
+        self._seed = seed
+        self._compute_checksum = compute_checksums
+        self._computed_checksum = None
+
+    @property
+    def computed_checksum(self) -> Optional[int]:
+        if not self._compute_checksum:
+            return None
+        if self._computed_checksum is None:
+            self._computed_checksum = cab_data_checksum(self.data, self._seed)
+        return self._computed_checksum
+
+    def verify(self) -> bool:
+        """
+        Return whether the block data matches its checksum. Blocks with a zero checksum, which
+        means that none was stored, and blocks whose checksum is not computed always pass.
+        """
+        if not self.provided_checksum:
+            return True
+        computed = self.computed_checksum
+        return computed is None or computed == self.provided_checksum
 
     def __repr__(self):
         if self.computed_checksum == self.provided_checksum:
@@ -240,7 +331,13 @@ class CabRef(NamedTuple):
 class CabDisk(Struct):
     MAGIC = B'MSCF'
 
-    def __init__(self, reader: StructReader[memoryview], compute_checksums: bool, no_magic: bool):
+    def __init__(
+        self,
+        reader: StructReader[memoryview],
+        compute_checksums: bool,
+        no_magic: bool,
+        verify: bool = False,
+    ):
         if no_magic:
             self.signature = self.MAGIC
         else:
@@ -283,7 +380,7 @@ class CabDisk(Struct):
         ) if self.flags & CabFlags.HasNext else None
 
         self.folders = [
-            CabFolder(reader, self, compute_checksums, no_magic) for _ in range(self.nr_of_folders)]
+            CabFolder(reader, self, compute_checksums, no_magic, verify) for _ in range(self.nr_of_folders)]
 
         reader.seekset(self.file_offset)
         self.files = [CabFile(reader) for _ in range(self.nr_of_files)]
@@ -307,11 +404,23 @@ class Cabinet:
     files: dict[int, list[CabFile]]
     disks: dict[int, list[CabDisk]]
 
-    def __init__(self, *disks: memoryview, compute_checksums: bool = True, no_magic: bool = False):
+    def __init__(
+        self,
+        *disks: memoryview,
+        compute_checksums: bool = True,
+        no_magic: bool = False,
+        verify: bool = False,
+    ):
+        """
+        Checksums are only computed when they are requested, normally by `Cabinet.check`. With
+        `verify`, the blocks of each folder are also checked when the folder is decompressed.
+        """
         self.disks = {}
         self.files = {}
+        self._by_name: Optional[dict[str, CabFile]] = None
         self.compute_checksums = compute_checksums
         self.no_magic = no_magic
+        self.verify = verify
         self.extend(disks)
 
     def get_files(self, id: Optional[int] = None):
@@ -322,6 +431,19 @@ class Cabinet:
         else:
             return self.files[id]
 
+    def get_file(self, name: str) -> Optional[CabFile]:
+        """
+        Return the file called `name` from any set, or `None`. The lookup table is built on the
+        first call; when several files have the same name, the first one listed wins.
+        """
+        if self._by_name is None:
+            by_name: dict[str, CabFile] = {}
+            for files in self.files.values():
+                for file in files:
+                    by_name.setdefault(file.name, file)
+            self._by_name = by_name
+        return self._by_name.get(name)
+
     def __bool__(self):
         return bool(self.disks)
 
@@ -330,7 +452,7 @@ class Cabinet:
 
     def extend(self, disks: Iterable[memoryview]):
         for d in disks:
-            disk = CabDisk(memoryview(d), self.compute_checksums, self.no_magic)
+            disk = CabDisk(memoryview(d), self.compute_checksums, self.no_magic, self.verify)
             byid = self.disks.setdefault(disk.id, [])
             byid.append(disk)
         for byid in self.disks.values():
@@ -340,6 +462,7 @@ class Cabinet:
         self.extend(disks)
 
     def process(self):
+        self._by_name = None
         for id, disks in self.disks.items():
             files = self.files[id] = []
             partial: Optional[CabFolder] = None
@@ -352,9 +475,7 @@ class Cabinet:
                         continue
                     if partial.method != folder.method:
                         raise ValueError('Mismatching methods for continued folder.')
-                    if folder.blocks:
-                        partial.blocks.extend(folder.blocks)
-                        folder.blocks.clear()
+                    partial._append_blocks(folder)
                     folders.append(partial)
                     partial = None
                 for file in disk.files:
@@ -394,12 +515,10 @@ class Cabinet:
             for disk in disks:
                 for f, folder in enumerate(disk.folders):
                     for b, block in enumerate(folder.blocks):
-                        if block.computed_checksum is None:
+                        if block.verify():
                             continue
                         p = block.provided_checksum
                         c = block.computed_checksum
-                        if p == c:
-                            continue
                         raise CabVolumeCorrupt(
                             F'Incorrect checksum in Disk {disk.index}, folder {f}, block {b}; '
                             F'provided value was {p:08X}, computed value {c:08X}.')
@@ -12,6 +12,11 @@ from .types import INF
 
 _NUM_PAIR_LEN_BITS = 4
 _PAIR_LEN_MASK = (1 << _NUM_PAIR_LEN_BITS) - 1
+_INVALID_SYMBOL = 0xFFFF
+_INVALID_ENTRY = (_INVALID_SYMBOL << _NUM_PAIR_LEN_BITS) | 1
+_LITERAL_PAIR = 1 << 24
+_MIN_TABLE_BITS = 7
+_MAX_TABLE_BITS = 12
 
 _BLOCK_TYPE_NUM_BITS = 3
 _BLOCK_TYPE_VERBATIM = 1 # noqa
@@ -71,15 +76,25 @@ class NonZeroSkippedByte(RuntimeError):
 
 
 class HuffmanDecoder:
+    """
+    Decodes a canonical Huffman code with a lookup table that is indexed by the next
+    `num_table_bits` bits of the input. An entry of the table holds the length of the code in its
+    lower `_NUM_PAIR_LEN_BITS` bits and the symbol above them. An entry whose length is zero
+    instead points to a secondary table for the codes longer than `num_table_bits` that share the
+    prefix; it holds the size of that table in bits and its offset above the size. The entries of
+    secondary tables hold the length of the code beyond the primary table bits.
+
+    With `literal_pairs` set, `build_literal_pairs` merges every primary entry that holds a symbol
+    below a given limit with the entry for the following bits if that holds another one, so that
+    both symbols can be decoded with a single lookup.
+    """
     def __init__(self, num_bits_max: int, num_symbols: int, num_table_bits: int = 9):
+        if not _MIN_TABLE_BITS <= num_table_bits <= min(num_bits_max - 1, _MAX_TABLE_BITS):
+            raise ValueError(F'Invalid number of table bits {num_table_bits}.')
         self.num_bits_max = num_bits_max
         self.num_symbols = num_symbols
         self.num_table_bits = num_table_bits
-
-        self._limits = uint32array(num_bits_max + 2)
-        self._poses = uint32array(num_bits_max + 1)
-        self._lens = uint32array(1 << num_table_bits)
-        self._symbols = uint32array(num_symbols)
+        self._table = []
 
     def build(self, lens: memoryview):
         num_bits_max = self.num_bits_max
@@ -88,62 +103,103 @@ class HuffmanDecoder:
         max_value = 1 << num_bits_max
 
         counts = uint32array(num_bits_max + 1)
+        limits = uint32array(num_bits_max + 1)
 
         for sym in range(num_symbols):
             counts[lens[sym]] += 1
 
-        self._limits[0] = 0
         start_pos = 0
-        count_sum = 0
-
         for i in range(1, num_bits_max + 1):
-            count = counts[i]
-            start_pos += count << (num_bits_max - i)
+            limits[i - 1] = start_pos
+            start_pos += counts[i] << (num_bits_max - i)
             if start_pos > max_value:
                 raise HuffmanStartOutOfBounds(start_pos, max_value)
-            self._limits[i] = start_pos
-            counts[i] = count_sum
-            self._poses[i] = count_sum
-            count_sum += count
-            count_sum &= 0xFFFFFFFF
-
-        counts[0] = count_sum
-        self._poses[0] = count_sum
-        self._limits[num_bits_max + 1] = max_value
 
+        # The codes of each length follow each other in the order of their symbols, starting at
+        # the end of the codes of the next shorter length.
+        table = [_INVALID_ENTRY] * (1 << num_table_bits)
+        long_codes = []
         for sym in range(num_symbols):
-            len = lens[sym]
-            if not len:
+            num_bits = lens[sym]
+            if not num_bits:
                 continue
-            offset = counts[len]
-            counts[len] += 1
-            self._symbols[offset] = sym
-            if len <= num_table_bits:
-                offset -= self._poses[len]
-                num = 1 << (num_table_bits - len)
-                val = len | (sym << _NUM_PAIR_LEN_BITS)
-                pos = (self._limits[len - 1] >> (num_bits_max - num_table_bits)) + (offset << (num_table_bits - len))
-                for k in range(num):
-                    self._lens[pos + k] = val
-
+            code = limits[num_bits - 1]
+            limits[num_bits - 1] = code + (1 << (num_bits_max - num_bits))
+            if num_bits <= num_table_bits:
+                pos = code >> (num_bits_max - num_table_bits)
+                num = 1 << (num_table_bits - num_bits)
+                table[pos:pos + num] = [num_bits | (sym << _NUM_PAIR_LEN_BITS)] * num
+            else:
+                long_codes.append((code, num_bits, sym))
+
+        if long_codes:
+            sub_bits = {}
+            for code, num_bits, _ in long_codes:
+                prefix = code >> (num_bits_max - num_table_bits)
+                sub_bits[prefix] = max(sub_bits.get(prefix, 0), num_bits - num_table_bits)
+            offsets = {}
+            for prefix, num_sub_bits in sub_bits.items():
+                offsets[prefix] = offset = len(table)
+                table[prefix] = ((offset << _NUM_PAIR_LEN_BITS) | num_sub_bits) << _NUM_PAIR_LEN_BITS
+                table.extend([_INVALID_ENTRY] * (1 << num_sub_bits))
+            for code, num_bits, sym in long_codes:
+                prefix = code >> (num_bits_max - num_table_bits)
+                num_sub_bits = sub_bits[prefix]
+                sub_len = num_bits - num_table_bits
+                index = (code >> (num_bits_max - num_table_bits - num_sub_bits)) & ((1 << num_sub_bits) - 1)
+                pos = offsets[prefix] + index
+                num = 1 << (num_sub_bits - sub_len)
+                table[pos:pos + num] = [sub_len | (sym << _NUM_PAIR_LEN_BITS)] * num
+
+        self._table = table
         return True
 
+    def build_literal_pairs(self, num_literals: int = 256):
+        num_table_bits = self.num_table_bits
+        table = self._table
+        single = table[:1 << num_table_bits]
+        # The entries that follow a code of a given length are every entry whose index is a
+        # multiple of the code's range; they are turned into the part of a pair that holds the
+        # second literal, or zero where that is not a literal whose code fits.
+        seconds = {}
+        for first_len in range(1, num_table_bits):
+            room = num_table_bits - first_len
+            seconds[first_len] = [
+                ((entry & _PAIR_LEN_MASK) << 20) | ((entry >> _NUM_PAIR_LEN_BITS) << 12) | (entry & _PAIR_LEN_MASK)
+                if 0 < (entry & _PAIR_LEN_MASK) <= room and (entry >> _NUM_PAIR_LEN_BITS) < num_literals else 0
+                for entry in single[::1 << first_len]
+            ]
+        pos = 0
+        while pos < len(single):
+            first = single[pos]
+            first_len = first & _PAIR_LEN_MASK
+            if not first_len or first == _INVALID_ENTRY:
+                pos += 1
+                continue
+            num = 1 << (num_table_bits - first_len)
+            if first_len < num_table_bits and (first >> _NUM_PAIR_LEN_BITS) < num_literals:
+                base = _LITERAL_PAIR | first
+                table[pos:pos + num] = [base + second if second else first for second in seconds[first_len]]
+            pos += num
+
     def decode(self, bits: BitDecoder) -> int:
         num_bits_max = self.num_bits_max
         num_table_bits = self.num_table_bits
+        table = self._table
         val = bits.get_value(num_bits_max)
-        if val < self._limits[num_table_bits]:
-            pair = self._lens[val >> (num_bits_max - num_table_bits)]
-            bits.move_position(pair & _PAIR_LEN_MASK)
-            return pair >> _NUM_PAIR_LEN_BITS
-        num_bits = num_table_bits + 1
-        while val >= self._limits[num_bits]:
-            num_bits += 1
-        if num_bits > num_bits_max:
+        pair = table[val >> (num_bits_max - num_table_bits)]
+        if pair >= _LITERAL_PAIR:
+            pair = (pair & 0xFF0) | ((pair & _PAIR_LEN_MASK) - ((pair >> 20) & _PAIR_LEN_MASK))
+        num_bits = pair & _PAIR_LEN_MASK
+        if not num_bits:
+            num_sub_bits = (pair >> _NUM_PAIR_LEN_BITS) & _PAIR_LEN_MASK
+            index = (val >> (num_bits_max - num_table_bits - num_sub_bits)) & ((1 << num_sub_bits) - 1)
+            pair = table[(pair >> (2 * _NUM_PAIR_LEN_BITS)) + index]
+            num_bits = num_table_bits + (pair & _PAIR_LEN_MASK)
+        if pair == _INVALID_ENTRY:
             return 0xFFFFFFFF
         bits.move_position(num_bits)
-        index = self._poses[num_bits] + ((val - self._limits[num_bits - 1]) >> (num_bits_max - num_bits))
-        return self._symbols[index]
+        return pair >> _NUM_PAIR_LEN_BITS
 
 
 class HuffmanDecoder7b:
@@ -209,20 +265,34 @@ class HuffmanDecoder7b:
 
 
 class BitDecoder:
+    """
+    Reads the bit stream of an LZX frame, which is a sequence of 16-bit little endian words whose
+    bits are read starting with the most significant one. The `_value` holds `_bitpos` unread bits
+    and is refilled with three words at a time from `_words`, a copy of the input in which the
+    bytes of every word are swapped, so that they can be read as one big endian integer. The
+    decoder loop keeps this state in local variables and calls `refill` when it runs low.
+    """
 
-    __slots__ = '_bitpos', '_value', '_buf', '_pos', 'overflow'
+    __slots__ = '_bitpos', '_value', '_buf', '_words', '_pos', 'overflow'
 
     def __init__(self):
         self._bitpos = 0
         self._value = 0
         self._buf = None
+        self._words = None
         self._pos = 0
         self.overflow = 0
 
     def initialize(self, data: bytearray):
+        size = len(data) & ~1
+        words = bytearray(size)
+        words[0::2] = data[1:size:2]
+        words[1::2] = data[0:size:2]
         self._buf = data
+        self._words = words
         self._pos = 0
         self._bitpos = 0
+        self._value = 0
         self.overflow = 0
 
     def get_remaining_bytes(self):
@@ -236,23 +306,32 @@ class BitDecoder:
         num_bits = self._bitpos & 15
         return not ((self._value >> (self._bitpos - num_bits)) & ((1 << num_bits) - 1))
 
-    def normalize_small(self):
-        if self._bitpos > 16:
-            return
-        pos = self._pos
+    def refill(self, value: int, bitpos: int, pos: int):
+        """
+        Return the bit buffer state given by `value`, `bitpos` and `pos` refilled to more than
+        16 bits. Past the end of the input, the buffer is filled with one bits and each missing
+        word counts towards the `overflow`.
+        """
         buf = self._buf
-        if pos >= len(buf) - 1:
-            val = 0xFFFF
-            self.overflow += 2
-        else:
-            val = int.from_bytes(buf[pos:pos + 2], 'little')
-            self._pos += 2
-        self._value = ((self._value & 0xFFFF) << 16) | val
-        self._bitpos += 16
+        if pos + 6 <= len(buf) and not pos & 1:
+            value = ((value & ((1 << bitpos) - 1)) << 48) | int.from_bytes(self._words[pos:pos + 6], 'big')
+            return value, bitpos + 48, pos + 6
+        while bitpos <= 16:
+            if pos >= len(buf) - 1:
+                val = 0xFFFF
+                self.overflow += 2
+            else:
+                val = int.from_bytes(buf[pos:pos + 2], 'little')
+                pos += 2
+            value = ((value & ((1 << bitpos) - 1)) << 16) | val
+            bitpos += 16
+        return value, bitpos, pos
 
-    def normalize_big(self):
-        self.normalize_small()
-        self.normalize_small()
+    def normalize_small(self):
+        if self._bitpos <= 16:
+            self._value, self._bitpos, self._pos = self.refill(self._value, self._bitpos, self._pos)
+
+    normalize_big = normalize_small
 
     def get_value(self, num_bits: int):
         return (self._value >> (self._bitpos - num_bits)) & ((1 << num_bits) - 1)
@@ -267,19 +346,17 @@ class BitDecoder:
         self.normalize_small()
         return val
 
-    def read_bits_big(self, num_bits: int):
-        self._bitpos -= num_bits
-        val = (self._value >> self._bitpos) & ((1 << num_bits) - 1)
-        self.normalize_big()
-        return val
+    read_bits_big = read_bits_small
 
     def prepare_uncompressed(self) -> bool:
         if self.overflow > 0:
             raise BitsReaderEOF
-        num_bits = self._bitpos - 16
-        if ((self._value >> 16) & ((1 << num_bits) - 1)):
+        # The rest of the current word is padding, or the next word if no bits of the current one
+        # are left. The words after it have been read ahead and are given back.
+        num_bits = ((self._bitpos - 1) & 15) + 1
+        if ((self._value >> (self._bitpos - num_bits)) & ((1 << num_bits) - 1)):
             return False
-        self._pos -= 2
+        self._pos -= (self._bitpos - num_bits) >> 3
         self._bitpos = 0
         return True
 
@@ -321,27 +398,29 @@ def _x86_filter(data: memoryview, size: int, processed_size: int, translate_size
     size -= 10
     if size <= 0:
         return
-    save = data[size + 4]
-    data[size + 4] = 0xE8
-    i = 0
-    while True:
-        while data[i] != 0xE8:
-            i += 1
-        if i >= size:
-            break
-        i = i + 1
-        v = int.from_bytes(data[i:i + 4], 'little', signed=True)
-        pos = 1 - (processed_size + i)
+    # The operands that are translated are skipped when looking for the next 0xE8 byte, so it
+    # can be searched for in a copy of the data.
+    find = bytes(data[:size]).find
+    i = find(0xE8)
+    while i >= 0:
+        end = i + 5
+        v = int.from_bytes(data[i + 1:end], 'little', signed=True)
+        pos = -(processed_size + i)
         if v >= pos and v < translate_size:
             v += pos if v >= 0 else translate_size
             v &= 0xFFFFFFFF
-            data[i:i + 4] = v.to_bytes(4, 'little')
-        i += 4
-    data[size + 4] = save
+            data[i + 1:end] = v.to_bytes(4, 'little')
+        i = find(0xE8, end)
 
 
 class LzxDecoder:
-    def __init__(self, wim_mode: bool = False):
+    """
+    Decodes LZX data, of the variant used in cabinets unless `wim_mode` is set. The Huffman
+    decoders of the main and length trees look up `num_table_bits` bits at a time, between 7 and
+    12; with `literal_pairs` set, the main decoder also decodes two literals at once where their
+    codes fit into one lookup.
+    """
+    def __init__(self, wim_mode: bool = False, num_table_bits: int = 11, literal_pairs: bool = False):
         self._win = None
         self._skip_byte = False
         self._wim_mode = wim_mode
@@ -366,8 +445,9 @@ class LzxDecoder:
         self._unpack_block_size = 0
         self._write_pos = 0
 
-        self._lzx_decoder = HuffmanDecoder(_NUM_HUFFMAN_BITS, _LZX_TABLE_SIZE)
-        self._len_decoder = HuffmanDecoder(_NUM_HUFFMAN_BITS, _NUM_LEN_SYMBOLS)
+        self._literal_pairs = literal_pairs
+        self._lzx_decoder = HuffmanDecoder(_NUM_HUFFMAN_BITS, _LZX_TABLE_SIZE, num_table_bits)
+        self._len_decoder = HuffmanDecoder(_NUM_HUFFMAN_BITS, _NUM_LEN_SYMBOLS, num_table_bits)
         self._align_decoder = HuffmanDecoder7b(_ALIGN_TABLE_SIZE)
         self._level_decoder = HuffmanDecoder(_NUM_HUFFMAN_BITS, _LVL_TABLE_SIZE, 7)
 
@@ -490,6 +570,8 @@ class LzxDecoder:
             end += t
         _memzap(lvl[end:_LZX_TABLE_SIZE])
         self._lzx_decoder.build(self._lzx_levels)
+        if self._literal_pairs:
+            self._lzx_decoder.build_literal_pairs()
         self.read_table(self._len_levels, _NUM_LEN_SYMBOLS)
         self._len_decoder.build(self._len_levels)
 
@@ -549,31 +631,96 @@ class LzxDecoder:
             log_phase = 'reading compressed block'
             cur_size -= next
             self._unpack_block_size -= next
+            # The state of the bit reader, the window position and the repeated offsets are kept in
+            # local variables while the block is decoded, and the table lookups of the Huffman
+            # decoders are inlined.
+            value, bitpos, pos = bits._value, bits._bitpos, bits._pos
+            refill = bits.refill
+            main_bits = self._lzx_decoder.num_table_bits
+            main_shift = _NUM_HUFFMAN_BITS - main_bits
+            main_table = self._lzx_decoder._table
+            len_bits = self._len_decoder.num_table_bits
+            len_shift = _NUM_HUFFMAN_BITS - len_bits
+            len_table = self._len_decoder._table
+            align_table = self._align_decoder._lens
+            num_align_bits = self._num_align_bits
+            num_pos_len_slots = self._num_pos_len_slots
+            over_dict = self._over_dict
+            mask = self._win_size
+            win_pos = self._pos
+            r0, r1, r2 = self._reps
+            literal_pairs = self._literal_pairs
             while next > 0:
                 if bits.overflow > 4:
                     raise BitsReaderEOF
-                sym = self._lzx_decoder.decode(bits)
-                if eof_halt and bits.overflow > 2:
-                    return
+                val = (value >> (bitpos - _NUM_HUFFMAN_BITS)) & 0xFFFF
+                pair = main_table[val >> main_shift]
+                if literal_pairs and pair >= _LITERAL_PAIR:
+                    if next > 1:
+                        win[win_pos] = (pair >> _NUM_PAIR_LEN_BITS) & 0xFF
+                        win[win_pos + 1] = (pair >> 12) & 0xFF
+                        win_pos += 2
+                        next -= 2
+                        bitpos -= pair & _PAIR_LEN_MASK
+                        if bitpos <= 16:
+                            value, bitpos, pos = refill(value, bitpos, pos)
+                            if eof_halt and bits.overflow > 2:
+                                self._pos = win_pos
+                                return
+                        continue
+                    # Only the first of the two literals is left in this block.
+                    pair = (pair & 0xFF0) | ((pair & _PAIR_LEN_MASK) - ((pair >> 20) & _PAIR_LEN_MASK))
+                num_bits = pair & _PAIR_LEN_MASK
+                if not num_bits:
+                    num_sub_bits = (pair >> _NUM_PAIR_LEN_BITS) & _PAIR_LEN_MASK
+                    index = (val >> (main_shift - num_sub_bits)) & ((1 << num_sub_bits) - 1)
+                    pair = main_table[(pair >> (2 * _NUM_PAIR_LEN_BITS)) + index]
+                    num_bits = main_bits + (pair & _PAIR_LEN_MASK)
+                bitpos -= num_bits
+                sym = pair >> _NUM_PAIR_LEN_BITS
+                if bitpos <= 16:
+                    value, bitpos, pos = refill(value, bitpos, pos)
+                    if eof_halt and bits.overflow > 2:
+                        self._pos = win_pos
+                        return
                 if sym < 256:
-                    win[self._pos] = sym
+                    win[win_pos] = sym
+                    win_pos += 1
                     next -= 1
-                    self._pos += 1
                     continue
                 sym -= 256
-                if sym >= self._num_pos_len_slots:
-                    raise OutOfBounds(log_phase, 'huffman length slot', sym, self._num_pos_len_slots)
-                pos_slot, len_slot = divmod(sym, _NUM_LEN_SLOTS)
+                if sym >= num_pos_len_slots:
+                    raise OutOfBounds(log_phase, 'huffman length slot', sym, num_pos_len_slots)
+                pos_slot = sym >> 3
+                len_slot = sym & 7
                 len = _MATCH_MIN_LEN + len_slot
                 if len_slot == _NUM_LEN_SLOTS - 1:
-                    len_temp = self._len_decoder.decode(bits)
+                    val = (value >> (bitpos - _NUM_HUFFMAN_BITS)) & 0xFFFF
+                    pair = len_table[val >> len_shift]
+                    num_bits = pair & _PAIR_LEN_MASK
+                    if not num_bits:
+                        num_sub_bits = (pair >> _NUM_PAIR_LEN_BITS) & _PAIR_LEN_MASK
+                        index = (val >> (len_shift - num_sub_bits)) & ((1 << num_sub_bits) - 1)
+                        pair = len_table[(pair >> (2 * _NUM_PAIR_LEN_BITS)) + index]
+                        num_bits = len_bits + (pair & _PAIR_LEN_MASK)
+                    bitpos -= num_bits
+                    len_temp = pair >> _NUM_PAIR_LEN_BITS
+                    if bitpos <= 16:
+                        value, bitpos, pos = refill(value, bitpos, pos)
                     if len_temp >= _NUM_LEN_SYMBOLS:
                         raise OutOfBounds(log_phase, 'huffman length symbol', len_temp, _NUM_LEN_SYMBOLS)
                     len = _MATCH_MIN_LEN + _NUM_LEN_SLOTS - 1 + len_temp
                 if pos_slot < _NUM_REPS:
-                    dist = self._reps[pos_slot]
-                    self._reps[pos_slot] = self._reps[0]
-                    self._reps[0] = dist
+                    if pos_slot == 0:
+                        dist = r0
+                    elif pos_slot == 1:
+                        dist = r1
+                        r1 = r0
+                        r0 = dist
+                    else:
+                        dist = r2
+                        r2 = r0
+                        r0 = dist
                 else:
                     if pos_slot < _NUM_POWER_POS_SLOTS:
                         num_direct_bits = (pos_slot >> 1) - 1
@@ -581,33 +728,55 @@ class LzxDecoder:
                     else:
                         num_direct_bits = _NUM_LINEAR_POS_SLOT_BITS
                         dist = ((pos_slot - 0x22) << _NUM_LINEAR_POS_SLOT_BITS)
-                    dist &= 0xFFFFFFFF
-                    if num_direct_bits >= self._num_align_bits:
-                        dist += bits.read_bits_small(num_direct_bits - _NUM_ALIGN_BITS) << _NUM_ALIGN_BITS
-                        align_temp = self._align_decoder.decode(bits)
+                    if num_direct_bits >= num_align_bits:
+                        num_bits = num_direct_bits - _NUM_ALIGN_BITS
+                        bitpos -= num_bits
+                        dist += ((value >> bitpos) & ((1 << num_bits) - 1)) << _NUM_ALIGN_BITS
+                        if bitpos <= 16:
+                            value, bitpos, pos = refill(value, bitpos, pos)
+                        pair = align_table[(value >> (bitpos - 7)) & 0x7F]
+                        bitpos -= pair & 7
+                        align_temp = pair >> 3
+                        if bitpos <= 16:
+                            value, bitpos, pos = refill(value, bitpos, pos)
                         if align_temp >= _ALIGN_TABLE_SIZE:
                             raise OutOfBounds(log_phase, 'align symbol', align_temp, _ALIGN_TABLE_SIZE)
                         dist += align_temp
                     else:
-                        dist += bits.read_bits_big(num_direct_bits)
+                        bitpos -= num_direct_bits
+                        dist += (value >> bitpos) & ((1 << num_direct_bits) - 1)
+                        if bitpos <= 16:
+                            value, bitpos, pos = refill(value, bitpos, pos)
                     dist -= _NUM_REPS - 1
-                    self._reps[2] = self._reps[1]
-                    self._reps[1] = self._reps[0]
-                    self._reps[0] = dist
+                    r2 = r1
+                    r1 = r0
+                    r0 = dist
                 if len > next:
                     raise OutOfBounds(log_phase, 'replay data length', len, next)
-                if dist > self._pos and not self._over_dict:
-                    raise OutOfBounds(log_phase, 'replay data distance', dist, self._pos)
-                mask = self._win_size
+                if dist > win_pos and not over_dict:
+                    raise OutOfBounds(log_phase, 'replay data distance', dist, win_pos)
                 next -= len
-                dst_pos = self._pos
-                src_pos = (self._pos - dist) % mask
-                for _ in range(len):
-                    win[dst_pos] = win[src_pos]
-                    dst_pos += 1
-                    src_pos += 1
-                    src_pos %= mask
-                self._pos += len
+                dst_pos = win_pos
+                src_pos = (win_pos - dist) % mask
+                win_pos += len
+                # The match is copied in slices: one up to the end of the window
+                # and, if the source wraps around, one from its start.
+                while len:
+                    size = min(len, mask - src_pos)
+                    if src_pos < dst_pos < src_pos + size:
+                        # The source overlaps the destination, so the match
+                        # repeats the last dst_pos - src_pos bytes.
+                        period = bytes(win[src_pos:dst_pos])
+                        count, rest = divmod(size, dst_pos - src_pos)
+                        win[dst_pos:dst_pos + size] = period * count + period[:rest]
+                    else:
+                        win[dst_pos:dst_pos + size] = win[src_pos:src_pos + size]
+                    dst_pos += size
+                    len -= size
+                    src_pos = 0
+            bits._value, bits._bitpos, bits._pos = value, bitpos, pos
+            self._pos = win_pos
+            self._reps[0], self._reps[1], self._reps[2] = r0, r1, r2
         return bits.was_finished_ok()
 
     def get_output_data(self):
@@ -60,6 +60,28 @@ class EOF(EOFError):
         return bytes(self.rest)
 
 
+def find_terminator(buf, terminator: bytes, pos: int, alignment: int = 1) -> int:
+    """
+    Find the first occurrence of `terminator` in `buf` at or after `pos` whose distance from `pos`
+    is a multiple of `alignment`, and return its offset, or -1. A `memoryview` has no `find`
+    method, so it is searched through copies of successively larger windows.
+    """
+    if isinstance(buf, memoryview):
+        size = 0x100
+        while True:
+            end = find_terminator(bytes(buf[pos:pos + size]), terminator, 0, alignment)
+            if end >= 0:
+                return pos + end
+            if pos + size >= len(buf):
+                return -1
+            size <<= 2
+    end = pos - 1
+    while True:
+        end = buf.find(terminator, end + 1)
+        if end < 0 or not (end - pos) % alignment:
+            return end
+
+
 class StreamDetour(Generic[R]):
     """
     A stream detour is used as a context manager to temporarily read from a different location
@@ -626,11 +648,9 @@ class StructReader(MemoryFile[T]):
         pos = self.tell()
         buf = self.getbuffer()
         try:
-            end = pos - 1
-            while True:
-                end = buf.find(terminator, end + 1)
-                if end < 0 or not (end - pos) % alignment:
-                    break
+            end = find_terminator(buf, terminator, pos, alignment)
+            if end < 0 and isinstance(buf, memoryview):
+                raise EOF
         except AttributeError:
             result = bytearray()
             while not self.eof:
@@ -0,0 +1,16 @@
+import io
+
+import pytest
+
+
+class SizedBytesIO(io.BytesIO):
+    """BytesIO with the ``size`` attribute of olefile streams."""
+
+    @property
+    def size(self):
+        return len(self.getbuffer())
+
+
+@pytest.fixture
+def sized_bytes_io():
+    return SizedBytesIO
@@ -532,3 +532,25 @@ def test_missing_tables_are_not_an_error():
     assert analysis.custom_actions == ()
     assert analysis.findings == ()
     assert "No CustomAction rows found" in format_analysis(analysis)
+
+
+class ProjectingPackage(FakePackage):
+    def __init__(self, tables=None, streams=None):
+        super().__init__(tables, streams)
+        self.requested = []
+
+    def get(self, name, columns=None):
+        self.requested.append((name, None if columns is None else tuple(columns)))
+        return super().get(name)
+
+
+def test_package_analysis_requests_columns_only_from_packages_that_take_them():
+    tables = {"Component": [{"Component": "Main", "Directory_": "TARGETDIR", "KeyPath": None}]}
+
+    projecting = ProjectingPackage(tables)
+    analyze_package(projecting)
+    assert ("Component", ("Component", "Directory_", "KeyPath")) in projecting.requested
+    assert ("Property", None) in projecting.requested
+
+    plain = FakePackage(tables)
+    assert not any("Could not read" in warning for warning in analyze_package(plain).warnings)
@@ -32,6 +32,10 @@ class FakeStringPool:
             string_ref |= reader.read_u8() << 16
         return {1: "qgis.ico"}.get(string_ref)
 
+    def resolve_all(self, string_refs):
+        self.calls = 1
+        return [{1: "qgis.ico"}.get(string_ref) for string_ref in string_refs]
+
 
 class FakeOle:
     def __init__(self, streams):
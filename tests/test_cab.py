@@ -0,0 +1,227 @@
+import mmap
+import struct
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from pymsi.msi.file import File
+from pymsi.msi.media import Media
+from pymsi.msi.msi import Msi
+from pymsi.thirdparty.refinery.cab import Cabinet, CabVolumeCorrupt, cab_data_checksum
+
+
+def build_cabinet(
+    files, compress=False, block_size=0x8000, set_id=0, index=0, prev=None, next=None, folder=0
+):
+    """Write a single-folder cabinet holding ``files`` (name -> bytes).
+
+    The folder is stored uncompressed, or as MSZip blocks with ``compress``.
+    ``prev`` and ``next`` name the neighbouring disks of a multi-disk set,
+    and ``folder`` is the folder index written for every file.
+    """
+    content = b"".join(files.values())
+    blocks = []
+    for start in range(0, len(content), block_size):
+        chunk = content[start : start + block_size]
+        if compress:
+            deflate = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+            data = b"CK" + deflate.compress(chunk) + deflate.flush()
+        else:
+            data = chunk
+        sizes = struct.pack("<HH", len(data), len(chunk))
+        checksum = cab_data_checksum(memoryview(data), int.from_bytes(sizes, "little"))
+        blocks.append(struct.pack("<I", checksum) + sizes + data)
+
+    entries = b""
+    offset = 0
+    for name, data in files.items():
+        entries += struct.pack("<IIHHHH", len(data), offset, folder, 0x5A21, 0x6000, 0x20)
+        entries += name.encode() + b"\0"
+        offset += len(data)
+
+    flags = (1 if prev else 0) | (2 if next else 0)
+    links = b"".join(name.encode() + b"\0" + b"disk\0" for name in (prev, next) if name)
+    header_size = 36 + len(links) + 8
+    data_start = header_size + len(entries)
+    total = data_start + sum(len(block) for block in blocks)
+    header = b"MSCF" + struct.pack(
+        "<IIIIIBBHHHHH", 0, total, 0, header_size, 0, 3, 1, 1, len(files), flags, set_id, index
+    )
+    folder = struct.pack("<IHH", data_start, len(blocks), 1 if compress else 0)
+    return header + links + folder + entries + b"".join(blocks)
+
+
+FILES = {"a.txt": b"alpha " * 1000, "b.bin": bytes(range(256)) * 300, "empty": b""}
+MEDIA_ROW = {
+    "DiskId": 1,
+    "LastSequence": 3,
+    "DiskPrompt": None,
+    "Cabinet": None,
+    "VolumeLabel": None,
+    "Source": None,
+}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_cabinet_extracts_files(compress):
+    cabinet = Cabinet(build_cabinet(FILES, compress=compress, block_size=4096)).process()
+
+    files = cabinet.get_files()
+    assert [file.name for file in files] == list(FILES)
+    for file in files:
+        assert bytes(file.decompress()) == FILES[file.name]
+    cabinet.check()
+
+
+def test_cabinet_reads_blocks_in_place_and_checksums_on_request():
+    data = bytearray(build_cabinet(FILES, block_size=4096))
+    cabinet = Cabinet(memoryview(data)).process()
+
+    blocks = cabinet.disks[0][0].folders[0].blocks
+    assert all(block.data.obj is data for block in blocks)
+    assert all(block._computed_checksum is None for block in blocks)
+
+    data[-1] ^= 0xFF
+    with pytest.raises(CabVolumeCorrupt):
+        cabinet.check()
+
+
+def test_cabinet_reads_only_headers_until_a_folder_is_decompressed():
+    cabinet = Cabinet(build_cabinet(FILES, block_size=4096)).process()
+
+    folder = cabinet.disks[0][0].folders[0]
+    assert [file.name for file in cabinet.get_files()] == list(FILES)
+    assert folder._blocks == [] and repr(folder) == "<fldr:Nothing(0):21>"
+
+    assert bytes(cabinet.get_files()[1].decompress()) == FILES["b.bin"]
+    assert len(folder._blocks) == 21 and not folder._chains
+
+
+def test_folder_continued_on_the_next_disk():
+    content = bytes(range(256)) * 64
+    first = build_cabinet({"split": content[:5000]}, block_size=4096, next="b.cab", folder=0xFFFE)
+    second = build_cabinet(
+        {"split": content[5000:]}, block_size=4096, index=1, prev="a.cab", folder=0xFFFD
+    )
+    # The file entry on the second disk describes the whole file.
+    second = second.replace(
+        struct.pack("<I", len(content) - 5000), struct.pack("<I", len(content)), 1
+    )
+
+    cabinet = Cabinet(second, first).process()
+    cabinet.check(checksums=False)
+
+    (file,) = cabinet.get_files()
+    assert file.folder is cabinet.disks[0][0].folders[0]
+    assert cabinet.disks[0][1].folders[0].blocks == []
+    assert bytes(file.decompress()) == content
+    assert len(file.folder.blocks) == 5
+
+
+@pytest.mark.parametrize("size", [0, 1, 3, 4, 7, 64, 4097, 0x8000])
+def test_checksum_matches_word_by_word_xor(size):
+    data = bytes((n * 7 + size) & 0xFF for n in range(size))
+    expected = 0x1234_5678
+    for offset in range(0, size - size % 4, 4):
+        expected ^= int.from_bytes(data[offset : offset + 4], "little")
+    if size % 4:
+        expected ^= int.from_bytes(data[size - size % 4 :], "big")
+
+    assert cab_data_checksum(memoryview(data), 0x1234_5678) == expected
+
+
+def _corrupt_cabinet():
+    data = bytearray(build_cabinet(FILES, block_size=4096))
+    data[-1] ^= 0xFF
+    return memoryview(data)
+
+
+def test_verify_policies():
+    lazy = Media(MEDIA_ROW)
+    lazy._populate(_corrupt_cabinet(), "lazy")
+    with pytest.raises(CabVolumeCorrupt):
+        lazy.cabinet.get_files()[0].decompress()
+
+    off = Media(MEDIA_ROW)
+    off._populate(_corrupt_cabinet(), "off")
+    assert bytes(off.cabinet.get_files()[0].decompress()) == FILES["a.txt"]
+    off.cabinet.check()
+
+    with pytest.raises(CabVolumeCorrupt):
+        Media(MEDIA_ROW)._populate(_corrupt_cabinet(), "eager")
+
+
+def test_blocks_without_a_checksum_are_not_verified():
+    data = _corrupt_cabinet()
+    # A zero checksum means that none was stored.
+    (offset,) = struct.unpack_from("<I", data, 36)
+    while offset < len(data):
+        data[offset : offset + 4] = bytes(4)
+        offset += 8 + struct.unpack_from("<H", data, offset + 4)[0]
+
+    cabinet = Cabinet(data, verify=True).process()
+    cabinet.check()
+    assert bytes(cabinet.get_files()[0].decompress()) == FILES["a.txt"]
+
+
+def test_files_are_found_by_name_across_sets():
+    cabinet = Cabinet(
+        build_cabinet(FILES, set_id=1),
+        build_cabinet({"c.txt": b"gamma", "a.txt": b"other"}, set_id=2),
+    ).process()
+
+    assert cabinet.get_file("b.bin") is cabinet.get_files(1)[1]
+    assert cabinet.get_file("c.txt") is cabinet.get_files(2)[0]
+    assert cabinet.get_file("a.txt") is cabinet.get_files(1)[0]
+    assert cabinet.get_file("missing") is None
+    with pytest.raises(LookupError):
+        cabinet.get_files()
+
+    media = Media(MEDIA_ROW)
+    media.cabinet = cabinet
+    file = File(
+        {
+            "File": "c.txt",
+            "Component_": "Main",
+            "FileName": "c.txt",
+            "FileSize": 5,
+            "Version": None,
+            "Language": None,
+            "Attributes": 0,
+            "Sequence": 1,
+        }
+    )
+    file.media = media
+    assert bytes(file.resolve().decompress()) == b"gamma"
+    file.id = "missing"
+    with pytest.raises(ValueError, match="not found"):
+        file.resolve()
+
+
+def _msi_with_media(tmp_path, cabinet_name):
+    msi = Msi.__new__(Msi)
+    msi.package = SimpleNamespace(path=tmp_path / "product.msi")
+    msi.verify = "lazy"
+    msi.medias = {1: Media(dict(MEDIA_ROW, Cabinet=cabinet_name))}
+    return msi
+
+
+def test_external_cabinet_is_memory_mapped(tmp_path):
+    (tmp_path / "data1.cab").write_bytes(build_cabinet(FILES))
+    msi = _msi_with_media(tmp_path, "data1.cab")
+
+    msi._load_media()
+
+    cabinet = msi.medias[1].cabinet
+    assert isinstance(cabinet.disks[0][0].folders[0].blocks[0].data.obj, mmap.mmap)
+    assert bytes(cabinet.get_files()[0].decompress()) == FILES["a.txt"]
+
+
+def test_external_cabinet_outside_package_directory_is_rejected(tmp_path):
+    (tmp_path / "data1.cab").write_bytes(build_cabinet(FILES))
+    msi = _msi_with_media(tmp_path / "sub", "../data1.cab")
+    (tmp_path / "sub").mkdir()
+
+    with pytest.raises(ValueError, match="parent directories"):
+        msi._load_media()
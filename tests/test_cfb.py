@@ -0,0 +1,210 @@
+import io
+import struct
+
+import olefile
+import pytest
+
+from pymsi.cfb import CompoundFile
+
+ENDOFCHAIN = 0xFFFF_FFFE
+FREESECT = 0xFFFF_FFFF
+FATSECT = 0xFFFF_FFFD
+DIFSECT = 0xFFFF_FFFC
+NOSTREAM = 0xFFFF_FFFF
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i : i + size].ljust(size, b"\0") for i in range(0, len(data), size)]
+
+
+def build_compound_file(streams, fragment=False):
+    """Write a version 3 compound file holding ``streams`` at the root.
+
+    With ``fragment``, the sectors of the large streams are interleaved so
+    that none of their chains is contiguous.
+    """
+    mini = {name: data for name, data in streams.items() if len(data) < 4096}
+    big = {name: data for name, data in streams.items() if len(data) >= 4096}
+
+    ministream = b""
+    minifat = []
+    starts = {}
+    for name, data in mini.items():
+        count = -(-len(data) // 64)
+        if count == 0:
+            starts[name] = ENDOFCHAIN
+            continue
+        first = len(ministream) // 64
+        starts[name] = first
+        minifat += [first + i + 1 for i in range(count - 1)] + [ENDOFCHAIN]
+        ministream += data.ljust(count * 64, b"\0")
+
+    names = sorted(streams, key=lambda name: (len(name), name.upper()))
+    num_entries = 1 + len(names)
+    chains = {name: _chunks(data, 512) for name, data in big.items()}
+    chains["\0ministream"] = _chunks(ministream, 512)
+    chains["\0minifat"] = _chunks(struct.pack(f"<{len(minifat)}I", *minifat), 512)
+    chains["\0directory"] = [b""] * -(-num_entries // 4)
+
+    placement = []
+    pending = {key: list(range(len(chunks))) for key, chunks in chains.items()}
+    while any(pending.values()):
+        for key in list(pending):
+            if pending[key]:
+                placement.append((key, pending[key].pop(0)))
+                if not fragment or key.startswith("\0"):
+                    while pending[key]:
+                        placement.append((key, pending[key].pop(0)))
+    sector_of = {item: sector for sector, item in enumerate(placement)}
+    fat = [0] * len(placement)
+    first_sector = {}
+    for key, chunks in chains.items():
+        sectors = [sector_of[(key, index)] for index in range(len(chunks))]
+        first_sector[key] = sectors[0] if sectors else ENDOFCHAIN
+        for current, following in zip(sectors, sectors[1:] + [ENDOFCHAIN]):
+            fat[current] = following
+
+    # FAT sectors beyond the 109 listed in the header are listed in DIFAT
+    # sectors, 127 per sector plus a link to the next one.
+    num_fat_sectors = num_difat_sectors = 1
+    while True:
+        num_difat_sectors = max(0, -(-(num_fat_sectors - 109) // 127))
+        if len(placement) + num_fat_sectors + num_difat_sectors <= num_fat_sectors * 128:
+            break
+        num_fat_sectors += 1
+    fat_sectors = list(range(len(placement), len(placement) + num_fat_sectors))
+    difat_sectors = [fat_sectors[-1] + 1 + i for i in range(num_difat_sectors)]
+    fat += [FATSECT] * num_fat_sectors + [DIFSECT] * num_difat_sectors
+    fat += [FREESECT] * (num_fat_sectors * 128 - len(fat))
+    difat = fat_sectors[109:]
+    difat += [FREESECT] * (num_difat_sectors * 127 - len(difat))
+    difat_data = b"".join(
+        struct.pack("<127I", *difat[i * 127 : (i + 1) * 127])
+        + struct.pack("<I", difat_sectors[i + 1] if i + 1 < num_difat_sectors else ENDOFCHAIN)
+        for i in range(num_difat_sectors)
+    )
+
+    def entry(name, entry_type, right, child, start, size):
+        raw = name.encode("utf-16-le")
+        return (
+            raw.ljust(64, b"\0")
+            + struct.pack(
+                "<HBB3I", len(raw) + 2 if name else 0, entry_type, 1, NOSTREAM, right, child
+            )
+            + b"\0" * 36
+            + struct.pack("<IQ", start, size)
+        )
+
+    directory = entry(
+        "Root Entry",
+        5,
+        NOSTREAM,
+        1 if names else NOSTREAM,
+        first_sector["\0ministream"],
+        len(ministream),
+    )
+    for index, name in enumerate(names, 2):
+        start = starts[name] if name in mini else first_sector[name]
+        right = index if index <= len(names) else NOSTREAM
+        directory += entry(name, 2, right, NOSTREAM, start, len(streams[name]))
+    directory += entry("", 0, NOSTREAM, NOSTREAM, 0, 0) * (-num_entries % 4)
+    chains["\0directory"] = _chunks(directory, 512)
+
+    header = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\0" * 16
+    header += struct.pack("<5H6x", 0x3E, 3, 0xFFFE, 9, 6)
+    header += struct.pack(
+        "<9I",
+        0,
+        num_fat_sectors,
+        first_sector["\0directory"],
+        0,
+        4096,
+        first_sector["\0minifat"],
+        len(chains["\0minifat"]),
+        difat_sectors[0] if difat_sectors else ENDOFCHAIN,
+        num_difat_sectors,
+    )
+    header_difat = fat_sectors[:109] + [FREESECT] * (109 - len(fat_sectors[:109]))
+    header += struct.pack("<109I", *header_difat)
+
+    body = b"".join(chains[key][index] for key, index in placement)
+    return header + body + struct.pack(f"<{len(fat)}I", *fat) + difat_data
+
+
+def _streams():
+    return {
+        "small": b"tiny stream",
+        "empty": b"",
+        "mini": bytes(range(256)) * 15,
+        "large": bytes(range(251)) * 80,
+        "larger": b"0123456789abcdef" * 2000,
+    }
+
+
+@pytest.mark.parametrize("fragment", [False, True])
+def test_streams_match_olefile(fragment):
+    data = build_compound_file(_streams(), fragment=fragment)
+    ole = olefile.OleFileIO(data)
+    compound = CompoundFile(data)
+
+    assert [kid.name for kid in compound.root.kids] == [kid.name for kid in ole.root.kids]
+    for name, content in _streams().items():
+        assert compound.exists(name)
+        assert compound.get_size(name) == len(content)
+        with compound.openstream(name.upper()) as stream:
+            assert stream.size == len(content)
+            assert stream.read() == ole.openstream(name).read() == content
+    assert not compound.exists("missing")
+    with pytest.raises(OSError):
+        compound.openstream("missing")
+
+
+def test_contiguous_streams_are_views_of_the_file():
+    data = build_compound_file(_streams())
+    compound = CompoundFile(data)
+
+    assert compound.stream_view("large").obj is data
+    assert compound.stream_view("mini").obj is data
+    assert bytes(compound.stream_view("larger")) == _streams()["larger"]
+
+    fragmented = CompoundFile(build_compound_file(_streams(), fragment=True))
+    assert fragmented.stream_view("large") == _streams()["large"]
+    assert fragmented.stream_view("large").obj is not data
+
+
+def test_only_zero_copy_stream_views_are_cached():
+    compound = CompoundFile(build_compound_file(_streams()))
+    assert compound.stream_view("large") is compound.stream_view("large")
+
+    fragmented = CompoundFile(build_compound_file(_streams(), fragment=True))
+    first = fragmented.stream_view("large")
+    assert first == _streams()["large"]
+    assert fragmented.stream_view("large") is not first
+    assert fragmented._find("large").sid not in fragmented._streams
+
+
+def test_stream_reads_seek_and_return_views():
+    compound = CompoundFile(build_compound_file(_streams()))
+    stream = compound.openstream("larger")
+
+    stream.seek(16 * 1999)
+    assert stream.read(100) == b"0123456789abcdef"
+    assert stream.read() == b""
+    stream.seek(-4, io.SEEK_END)
+    assert stream.read_view(2) == b"cd"
+    assert stream.tell() == 16 * 2000 - 2
+
+
+def test_rejects_files_that_are_not_compound_files():
+    with pytest.raises(ValueError, match="signature"):
+        CompoundFile(b"MZ" + b"\0" * 1024)
+
+
+def test_reads_fat_sectors_listed_in_difat_sectors():
+    streams = {"big": bytes(range(256)) * 36_000, "small": b"x"}
+    data = build_compound_file(streams)
+    compound = CompoundFile(data)
+
+    assert compound._num_difat_sectors == 1
+    assert compound.stream_view("big").obj is data
+    assert compound.stream_view("big") == olefile.OleFileIO(data).openstream("big").read()
@@ -0,0 +1,513 @@
+import heapq
+import random
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pymsi.thirdparty.refinery.cab import Cabinet, _get_lzx_decoder
+from pymsi.thirdparty.refinery.lzx import BitDecoder, HuffmanDecoder, LzxDecoder, _x86_filter
+
+FRAME_SIZE = 0x8000
+VERBATIM, ALIGNED, UNCOMPRESSED = 1, 2, 3
+
+
+class _BitWriter:
+    """Writes bits most significant first into little-endian 16-bit words."""
+
+    def __init__(self):
+        self.out = bytearray()
+        self._value = 0
+        self._count = 0
+
+    def put(self, value, num_bits):
+        self._value = (self._value << num_bits) | value
+        self._count += num_bits
+        while self._count >= 16:
+            self._count -= 16
+            self.out += ((self._value >> self._count) & 0xFFFF).to_bytes(2, "little")
+        self._value &= (1 << self._count) - 1
+
+    def align(self, always=False):
+        if self._count or always:
+            self.put(0, 16 - self._count)
+
+
+def _huffman_lengths(freqs, max_bits):
+    freqs = list(freqs)
+    while True:
+        lengths = [0] * len(freqs)
+        heap = [(freq, sym, [sym]) for sym, freq in enumerate(freqs) if freq]
+        if len(heap) == 1:
+            lengths[heap[0][1]] = 1
+        heapq.heapify(heap)
+        while len(heap) > 1:
+            freq1, key, syms1 = heapq.heappop(heap)
+            freq2, _, syms2 = heapq.heappop(heap)
+            for sym in syms1 + syms2:
+                lengths[sym] += 1
+            heapq.heappush(heap, (freq1 + freq2, key, syms1 + syms2))
+        if max(lengths) <= max_bits:
+            return lengths
+        freqs = [(freq + 1) // 2 for freq in freqs]
+
+
+def _canonical_codes(lengths):
+    codes = [0] * len(lengths)
+    code = 0
+    for num_bits in range(1, max(lengths, default=0) + 1):
+        for sym, length in enumerate(lengths):
+            if length == num_bits:
+                codes[sym] = code
+                code += 1
+        code <<= 1
+    return codes
+
+
+class _Tree:
+    def __init__(self, freqs, max_bits):
+        self.lengths = _huffman_lengths(freqs, max_bits)
+        self.codes = _canonical_codes(self.lengths)
+
+    def put(self, writer, sym):
+        writer.put(self.codes[sym], self.lengths[sym])
+
+
+def _write_lengths(writer, previous, lengths):
+    """Write ``lengths`` as pretree-coded deltas against ``previous``."""
+    items = []
+    i = 0
+    while i < len(lengths):
+        zeros = same = 1
+        while i + zeros < len(lengths) and zeros < 51 and lengths[i + zeros] == 0:
+            zeros += 1
+        while i + same < len(lengths) and same < 5 and lengths[i + same] == lengths[i]:
+            same += 1
+        delta = (previous[i] - lengths[i]) % 17
+        if lengths[i] == 0 and zeros >= 20:
+            items.append((18, zeros - 20, 5, None))
+            i += zeros
+        elif lengths[i] == 0 and zeros >= 4:
+            items.append((17, zeros - 4, 4, None))
+            i += zeros
+        elif same >= 4:
+            items.append((19, same - 4, 1, delta))
+            i += same
+        else:
+            items.append((delta, 0, 0, None))
+            i += 1
+    freqs = [0] * 20
+    for sym, _, _, delta in items:
+        freqs[sym] += 1
+        if delta is not None:
+            freqs[delta] += 1
+    pretree = _Tree(freqs, 15)
+    for length in pretree.lengths:
+        writer.put(length, 4)
+    for sym, extra, num_bits, delta in items:
+        pretree.put(writer, sym)
+        writer.put(extra, num_bits)
+        if delta is not None:
+            pretree.put(writer, delta)
+    previous[: len(lengths)] = lengths
+
+
+def _position_slots(num_slots):
+    slots = []
+    for slot in range(num_slots):
+        if slot < 38:
+            num_direct_bits = max((slot >> 1) - 1, 0)
+            base = (2 | (slot & 1)) << num_direct_bits if slot >= 2 else slot
+        else:
+            num_direct_bits = 17
+            base = (slot - 0x22) << 17
+        slots.append((base, num_direct_bits))
+    return slots
+
+
+def _e8_translate(frame, offset, translation_size):
+    frame = bytearray(frame)
+    i = 0
+    while i < len(frame) - 10:
+        if frame[i] != 0xE8:
+            i += 1
+            continue
+        rel = int.from_bytes(frame[i + 1 : i + 5], "little", signed=True)
+        position = offset + i
+        if -position <= rel < translation_size:
+            absolute = (
+                rel + position if rel < translation_size - position else rel - translation_size
+            )
+            frame[i + 1 : i + 5] = (absolute & 0xFFFFFFFF).to_bytes(4, "little")
+        i += 5
+    return bytes(frame)
+
+
+def _match_length(data, a, b, limit):
+    length = 0
+    while length < limit and data[a + length] == data[b + length]:
+        length += 1
+    return length
+
+
+def lzx_compress(data, window_bits=15, block_types=(VERBATIM,), translation_size=None):
+    """Compress ``data`` into LZX frames as stored in the blocks of a cabinet folder.
+
+    Returns a list of ``(compressed, uncompressed_size)`` pairs, one per 32 KiB
+    frame.  Each frame holds one block; the block types cycle through
+    ``block_types``.  Matches are found greedily, prefer the repeated offsets
+    and may overlap the bytes they produce.
+    """
+    num_slots = window_bits * 2 if window_bits < 20 else 34 + (1 << (window_bits - 17))
+    slots = _position_slots(num_slots)
+    max_dist = (1 << window_bits) - 3
+    if translation_size is not None:
+        data = b"".join(
+            _e8_translate(data[start : start + FRAME_SIZE], start, translation_size)
+            for start in range(0, len(data), FRAME_SIZE)
+        )
+    main_levels = [0] * (256 + num_slots * 8)
+    len_levels = [0] * 249
+    reps = [1, 1, 1]
+    chains = {}
+    frames = []
+
+    for number, start in enumerate(range(0, len(data), FRAME_SIZE)):
+        end = min(start + FRAME_SIZE, len(data))
+        block_type = block_types[number % len(block_types)]
+        writer = _BitWriter()
+        if number == 0:
+            writer.put(translation_size is not None, 1)
+            if translation_size is not None:
+                writer.put(translation_size >> 16, 16)
+                writer.put(translation_size & 0xFFFF, 16)
+        writer.put(block_type, 3)
+        writer.put((end - start) >> 8, 16)
+        writer.put((end - start) & 0xFF, 8)
+
+        if block_type == UNCOMPRESSED:
+            writer.align(always=True)
+            writer.out += struct.pack("<3I", *reps) + data[start:end]
+            writer.out += bytes((end - start) & 1)
+            for pos in range(start, end - 2):
+                chains.setdefault(data[pos : pos + 3], []).append(pos)
+            frames.append((bytes(writer.out), end - start))
+            continue
+
+        tokens = []
+        pos = start
+        while pos < end:
+            limit = min(257, end - pos)
+            best_len, best_dist = 0, 0
+            if limit >= 2:
+                for dist in reps:
+                    if dist <= pos:
+                        length = _match_length(data, pos - dist, pos, limit)
+                        if length > best_len:
+                            best_len, best_dist = length, dist
+                for candidate in reversed(chains.get(data[pos : pos + 3], [])[-8:]):
+                    if pos - candidate > max_dist:
+                        break
+                    length = _match_length(data, candidate, pos, limit)
+                    if length > best_len + 1:
+                        best_len, best_dist = length, pos - candidate
+            if best_len < 3:
+                best_len = 1
+                tokens.append(data[pos])
+            else:
+                if best_dist in reps:
+                    slot = reps.index(best_dist)
+                    reps[0], reps[slot] = reps[slot], reps[0]
+                    extra = None
+                else:
+                    formatted = best_dist + 2
+                    slot = max(
+                        s for s, (base, _) in enumerate(slots) if 3 <= s and base <= formatted
+                    )
+                    extra = formatted - slots[slot][0]
+                    reps[:] = [best_dist, reps[0], reps[1]]
+                tokens.append((best_len, slot, extra))
+            for covered in range(pos, pos + best_len):
+                chains.setdefault(data[covered : covered + 3], []).append(covered)
+            pos += best_len
+
+        main_freqs = [0] * len(main_levels)
+        len_freqs = [0] * len(len_levels)
+        align_freqs = [0] * 8
+        for token in tokens:
+            if isinstance(token, int):
+                main_freqs[token] += 1
+                continue
+            length, slot, extra = token
+            main_freqs[256 + slot * 8 + min(length - 2, 7)] += 1
+            if length >= 9:
+                len_freqs[length - 9] += 1
+            if extra is not None and block_type == ALIGNED and slots[slot][1] >= 3:
+                align_freqs[extra & 7] += 1
+
+        main_tree = _Tree(main_freqs, 16)
+        len_tree = _Tree(len_freqs, 16)
+        align_tree = _Tree(align_freqs, 7)
+        if block_type == ALIGNED:
+            for length in align_tree.lengths:
+                writer.put(length, 3)
+        for part in (slice(0, 256), slice(256, len(main_levels))):
+            previous = main_levels[part]
+            _write_lengths(writer, previous, main_tree.lengths[part])
+            main_levels[part] = previous
+        _write_lengths(writer, len_levels, len_tree.lengths)
+
+        for token in tokens:
+            if isinstance(token, int):
+                main_tree.put(writer, token)
+                continue
+            length, slot, extra = token
+            main_tree.put(writer, 256 + slot * 8 + min(length - 2, 7))
+            if length >= 9:
+                len_tree.put(writer, length - 9)
+            if extra is None:
+                continue
+            num_direct_bits = slots[slot][1]
+            if block_type == ALIGNED and num_direct_bits >= 3:
+                writer.put(extra >> 3, num_direct_bits - 3)
+                align_tree.put(writer, extra & 7)
+            else:
+                writer.put(extra, num_direct_bits)
+        writer.align()
+        frames.append((bytes(writer.out), end - start))
+    return frames
+
+
+def lzx_decompress(frames, window_bits=15, **options):
+    lzx = LzxDecoder(False, **options)
+    lzx.set_params_and_alloc(window_bits)
+    output = bytearray()
+    for data, size in frames:
+        output += lzx.decompress(memoryview(data), size)
+        lzx.keep_history = True
+    return bytes(output)
+
+
+def _text(size, seed=0):
+    rng = random.Random(seed)
+    words = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9)))
+        for _ in range(300)
+    ]
+    text = " ".join(rng.choice(words) for _ in range(size // 5)).encode()
+    return text[:size]
+
+
+def _code(size, seed=0):
+    """Bytes that look like x86 code, with relative calls to a few targets."""
+    rng = random.Random(seed)
+    targets = [rng.randrange(size) for _ in range(40)]
+    code = bytearray()
+    while len(code) < size:
+        if rng.random() < 0.3:
+            code += b"\xe8" + (rng.choice(targets) - len(code) - 5).to_bytes(
+                4, "little", signed=True
+            )
+        else:
+            code += rng.choice(
+                [b"\x55\x8b\xec", b"\x83\xec\x10", b"\x8b\x45\x08", b"\x5d\xc3", b"\x90"]
+            )
+    return bytes(code[:size])
+
+
+def _runs(size, seed=0):
+    rng = random.Random(seed)
+    data = bytearray()
+    while len(data) < size:
+        pattern = bytes(rng.randrange(256) for _ in range(rng.choice([1, 2, 3, 7, 50])))
+        data += pattern * rng.randint(1, 600)
+    return bytes(data[:size])
+
+
+def _noise(size, seed=0):
+    rng = random.Random(seed)
+    return bytes(rng.getrandbits(8) for _ in range(size))
+
+
+CORPUS = {
+    "text": _text(70_000),
+    "code": _code(80_000),
+    "runs": _runs(70_000),
+    "noise": _noise(40_001),
+    "mixed": _text(30_000, 1) + _noise(20_000, 1) + _text(30_000, 1) + _runs(20_000, 1),
+}
+
+
+@pytest.mark.parametrize("name", CORPUS)
+@pytest.mark.parametrize(
+    "block_types", [(VERBATIM,), (ALIGNED,), (VERBATIM, UNCOMPRESSED, ALIGNED)], ids=str
+)
+def test_decompresses_corpus(name, block_types):
+    data = CORPUS[name]
+    assert lzx_decompress(lzx_compress(data, block_types=block_types)) == data
+
+
+@pytest.mark.parametrize("window_bits", [15, 16, 21])
+def test_matches_across_frames_and_window_wrap(window_bits):
+    data = CORPUS["mixed"] + CORPUS["text"][:60_000] + CORPUS["mixed"]
+    frames = lzx_compress(data, window_bits, block_types=(VERBATIM, ALIGNED))
+    assert lzx_decompress(frames, window_bits) == data
+
+
+def test_e8_translation():
+    data = CORPUS["code"]
+    frames = lzx_compress(data, block_types=(ALIGNED, UNCOMPRESSED), translation_size=12_000_000)
+    assert lzx_decompress(frames) == data
+
+
+def test_match_wrapping_around_the_window():
+    # The second frame starts at the beginning of the 32 KiB window, so this
+    # match reads from its end and then from the bytes it has just written.
+    data = bytearray(_noise(FRAME_SIZE + 5))
+    for _ in range(257):
+        data.append(data[-100])
+    frames = lzx_compress(bytes(data))
+    assert lzx_decompress(frames) == data
+
+
+@pytest.mark.parametrize("num_table_bits", [7, 9, 11, 12])
+def test_huffman_codes_longer_than_the_table(num_table_bits):
+    # One code of each length from 1 to 16 bits, and a second one of 16 bits.
+    lengths = list(range(1, 17)) + [16, 0]
+    codes = _canonical_codes(lengths)
+    symbols = [sym for sym in range(17) for _ in range(3)]
+    random.Random(1).shuffle(symbols)
+    writer = _BitWriter()
+    for sym in symbols:
+        writer.put(codes[sym], lengths[sym])
+    writer.align()
+
+    decoder = HuffmanDecoder(16, len(lengths), num_table_bits)
+    decoder.build(lengths)
+    decoder.build_literal_pairs(4)
+    bits = BitDecoder()
+    bits.initialize(bytes(writer.out))
+    bits.normalize_big()
+    assert [decoder.decode(bits) for _ in symbols] == symbols
+
+    # The all-ones code is not assigned, so the tree is incomplete there.
+    bits.initialize(b"\xff\xff")
+    bits.normalize_big()
+    decoder.build(lengths[:-2] + [0, 0])
+    assert decoder.decode(bits) == 0xFFFFFFFF
+
+
+@pytest.mark.parametrize("num_table_bits", [0, 6, 13, 15])
+def test_table_bits_outside_the_supported_range(num_table_bits):
+    with pytest.raises(ValueError, match="table bits"):
+        HuffmanDecoder(16, 18, num_table_bits)
+    with pytest.raises(ValueError, match="table bits"):
+        LzxDecoder(num_table_bits=num_table_bits)
+
+
+@pytest.mark.parametrize("num_table_bits", [9, 11, 12])
+@pytest.mark.parametrize("literal_pairs", [False, True])
+def test_table_sizes_and_literal_pairs(num_table_bits, literal_pairs):
+    data = CORPUS["mixed"]
+    frames = lzx_compress(data, block_types=(VERBATIM, ALIGNED, UNCOMPRESSED))
+    assert (
+        lzx_decompress(frames, num_table_bits=num_table_bits, literal_pairs=literal_pairs) == data
+    )
+
+
+def _reference_x86_filter(data, size, processed_size, translate_size):
+    """The byte-by-byte E8 translation of the original 7-Zip port."""
+    size -= 10
+    if size <= 0:
+        return
+    save = data[size + 4]
+    data[size + 4] = 0xE8
+    i = 0
+    while True:
+        while data[i] != 0xE8:
+            i += 1
+        if i >= size:
+            break
+        i = i + 1
+        v = int.from_bytes(data[i : i + 4], "little", signed=True)
+        pos = 1 - (processed_size + i)
+        if v >= pos and v < translate_size:
+            v += pos if v >= 0 else translate_size
+            v &= 0xFFFFFFFF
+            data[i : i + 4] = v.to_bytes(4, "little")
+        i += 4
+    data[size + 4] = save
+
+
+@pytest.mark.parametrize("size", [5, 10, 11, 15, 100, FRAME_SIZE])
+def test_x86_filter_matches_reference(size):
+    rng = random.Random(size)
+    for processed_size, translate_size in [
+        (0, 12_000_000),
+        (FRAME_SIZE, 1 << 16),
+        (1 << 29, 1 << 31),
+    ]:
+        for data in (
+            _code(size, size),
+            bytes(rng.choice([0xE8, 0x00, 0xFF, 0x01]) for _ in range(size)),
+        ):
+            expected = bytearray(data)
+            _reference_x86_filter(expected, size, processed_size, translate_size)
+            actual = bytearray(data)
+            _x86_filter(memoryview(actual), size, processed_size, translate_size)
+            assert actual == expected
+
+
+def _lzx_cabinet(files, window_bits=15):
+    """Write a cabinet that stores each of ``files`` (name -> bytes) in its own LZX folder."""
+    folders = [lzx_compress(data, window_bits) for data in files.values()]
+    entries = b"".join(
+        struct.pack("<IIHHHH", len(data), 0, index, 0x5A21, 0x6000, 0x20) + name.encode() + b"\0"
+        for index, (name, data) in enumerate(files.items())
+    )
+    offset = 36 + 8 * len(folders) + len(entries)
+    headers = b""
+    blocks = b""
+    for frames in folders:
+        headers += struct.pack("<IHH", offset + len(blocks), len(frames), 3 | window_bits << 8)
+        for data, size in frames:
+            blocks += struct.pack("<IHH", 0, len(data), size) + data
+    header = b"MSCF" + struct.pack(
+        "<IIIIIBBHHHHH",
+        0,
+        offset + len(blocks),
+        0,
+        36 + 8 * len(folders),
+        0,
+        3,
+        1,
+        len(folders),
+        len(files),
+        0,
+        0,
+        0,
+    )
+    return header + headers + entries + blocks
+
+
+def test_cabinet_folders_share_a_decoder_per_thread():
+    files = {"a.txt": CORPUS["text"], "b.bin": CORPUS["code"], "c": _noise(10), "d": b"x"}
+    cabinet = Cabinet(_lzx_cabinet(files)).process()
+
+    for file in cabinet.get_files():
+        assert bytes(file.decompress()) == files[file.name]
+    decoder = _get_lzx_decoder(15)
+    assert decoder is _get_lzx_decoder(15)
+    assert decoder is not _get_lzx_decoder(16)
+
+    # A new folder starts without the history of the previous one.
+    assert (
+        bytes(Cabinet(_lzx_cabinet(files)).process().get_files()[1].decompress()) == files["b.bin"]
+    )
+
+    with ThreadPoolExecutor(2) as executor:
+        other = executor.submit(_get_lzx_decoder, 15).result()
+        assert other is not decoder
+        cabinet = Cabinet(_lzx_cabinet(files, 16)).process()
+        folders = executor.map(lambda file: bytes(file.decompress()), cabinet.get_files())
+        assert list(folders) == list(files.values())
@@ -0,0 +1,327 @@
+import pytest
+
+from pymsi.msi.component import Component
+from pymsi.msi.directory import Directory
+from pymsi.msi.file import File
+from pymsi.msi.linker import Linker
+from pymsi.msi.media import Media, MediaIndex
+from pymsi.msi.msi import Msi
+from pymsi.msi.registry import Registry
+
+
+def _media(disk_id, last_sequence):
+    return Media(
+        {
+            "DiskId": disk_id,
+            "LastSequence": last_sequence,
+            "DiskPrompt": None,
+            "Cabinet": None,
+            "VolumeLabel": None,
+            "Source": None,
+        }
+    )
+
+
+def _file(file_id, sequence, component="Main"):
+    return File(
+        {
+            "File": file_id,
+            "Component_": component,
+            "FileName": file_id,
+            "FileSize": 0,
+            "Version": None,
+            "Language": None,
+            "Attributes": 0,
+            "Sequence": sequence,
+        }
+    )
+
+
+def _component(component_id="Main", directory="TARGETDIR"):
+    return Component(
+        {
+            "Component": component_id,
+            "ComponentId": None,
+            "Directory_": directory,
+            "Attributes": 0,
+            "Condition": None,
+            "KeyPath": None,
+        }
+    )
+
+
+def test_media_index_finds_the_first_media_ending_at_or_after_a_sequence():
+    medias = [_media(3, 30), _media(1, 10), _media(2, 20), _media(4, 20)]
+    index = MediaIndex(medias)
+
+    assert [index.find(sequence).id for sequence in (1, 10, 11, 20, 21, 30)] == [1, 1, 2, 2, 3, 3]
+    assert index.find(31) is None
+    assert MediaIndex([]).find(1) is None
+
+
+def _directory(directory_id, parent, name="."):
+    return Directory({"Directory": directory_id, "Directory_Parent": parent, "DefaultDir": name})
+
+
+def _registry(registry_id, component):
+    return Registry(
+        {
+            "Registry": registry_id,
+            "Root": 2,
+            "Key": "Software\\Example",
+            "Name": None,
+            "Value": None,
+            "Component_": component,
+        }
+    )
+
+
+def _msi(directories=(), components=(), files=(), registry_keys=(), medias=()):
+    msi = Msi.__new__(Msi)
+    msi.directories = {directory.id: directory for directory in directories}
+    msi.components = {component.id: component for component in components}
+    msi.files = {file.id: file for file in files}
+    msi.registry_keys = {registry.id: registry for registry in registry_keys}
+    msi.remove_files = {}
+    msi.shortcuts = {}
+    msi.icons = {}
+    msi.medias = {media.id: media for media in medias}
+    return msi
+
+
+def _link(msi, strict=True):
+    # Link in the order Msi builds its collections: referenced tables first.
+    linker = Linker(msi, strict)
+    for entities in (
+        msi.directories,
+        msi.components,
+        msi.files,
+        msi.registry_keys,
+        msi.remove_files,
+        msi.shortcuts,
+    ):
+        linker.link_entities(entities.values())
+    return linker.warnings
+
+
+def test_linker_resolves_references_in_one_pass():
+    msi = _msi(
+        directories=[
+            _directory("TARGETDIR", None, "SourceDir"),
+            _directory("INSTALLDIR", "ProgramFilesFolder", "App"),
+            _directory("BIN", "INSTALLDIR", "bin"),
+        ],
+        components=[_component("Main", "BIN")],
+        files=[_file("app.exe", 1)],
+        registry_keys=[_registry("Reg", "Main")],
+        medias=[_media(1, 1)],
+    )
+
+    warnings = _link(msi)
+
+    # The missing parent is added under TARGETDIR and reported, even in strict mode.
+    placeholder = msi.directories["ProgramFilesFolder"]
+    assert placeholder.parent is msi.directories["TARGETDIR"]
+    assert msi.directories["INSTALLDIR"].parent is placeholder
+    assert [str(warning) for warning in warnings] == [
+        "Directory 'INSTALLDIR': Directory_Parent refers to Directory 'ProgramFilesFolder', "
+        "which does not exist; added it as a placeholder under TARGETDIR"
+    ]
+    main = msi.components["Main"]
+    assert main.directory is msi.directories["BIN"]
+    assert msi.directories["BIN"].components == {"Main": main}
+    assert main.files == {"app.exe": msi.files["app.exe"]}
+    assert main.registry_keys == {"Reg": msi.registry_keys["Reg"]}
+    assert msi.files["app.exe"].media is msi.medias[1]
+
+
+def test_child_collections_are_read_only_whether_or_not_they_are_empty():
+    msi = _msi(
+        directories=[_directory("TARGETDIR", None)],
+        components=[_component("Main")],
+        files=[_file("a.txt", 1)],
+        medias=[_media(1, 1)],
+    )
+    _link(msi)
+
+    main = msi.components["Main"]
+    for children in (main.files, main.shortcuts):
+        assert type(children) is type(main.registry_keys)
+        with pytest.raises(TypeError):
+            children["new"] = None
+    assert main.files == {"a.txt": msi.files["a.txt"]}
+    assert not main.shortcuts
+
+
+def test_dangling_references_are_errors_only_in_strict_mode():
+    def build():
+        return _msi(
+            directories=[_directory("TARGETDIR", None)],
+            components=[_component("Main", "Missing")],
+            files=[_file("a.txt", 5), _file("b.txt", 11, component="Gone")],
+            medias=[_media(1, 10)],
+        )
+
+    with pytest.raises(ValueError, match="Component 'Main': Directory_ refers to Directory"):
+        _link(build())
+
+    msi = build()
+    warnings = _link(msi, strict=False)
+    assert [(w.table, w.row, w.column, w.target, w.reference) for w in warnings] == [
+        ("Component", "Main", "Directory_", "Directory", "Missing"),
+        ("File", "b.txt", "Component_", "Component", "Gone"),
+        ("File", "b.txt", "Sequence", "Media", 11),
+    ]
+    assert "past the LastSequence of every Media row" in str(warnings[-1])
+    assert msi.components["Main"].directory is None
+    assert msi.files["a.txt"].media.id == 1
+    assert msi.files["b.txt"].component is None and msi.files["b.txt"].media is None
+
+
+def test_unresolved_links_print_as_missing(capsys):
+    msi = _msi(
+        directories=[_directory("TARGETDIR", None)],
+        components=[_component("Main", "Missing")],
+        files=[_file("a.txt", 5), _file("b.txt", 11, component="Gone")],
+        registry_keys=[_registry("Reg", "Gone")],
+        medias=[_media(1, 10)],
+    )
+    _link(msi, strict=False)
+
+    msi.components["Main"].pretty_print()
+    msi.files["b.txt"].pretty_print()
+    msi.registry_keys["Reg"].pretty_print()
+    output = capsys.readouterr().out
+    assert "Directory: Missing <missing>" in output
+    assert "Component: Main (<missing>)" in output
+    assert "Component: Gone <missing>" in output
+    assert "Media: <missing>" in output
+    with pytest.raises(ValueError, match="b.txt .* has no Media row: sequence 11"):
+        msi.files["b.txt"].resolve()
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter(self, localize):
+        return iter(self.rows)
+
+
+class FakePackage:
+    def __init__(self, tables):
+        self.tables = tables
+        self.requested = []
+
+    def get(self, name):
+        self.requested.append(name)
+        rows = self.tables.get(name)
+        return None if rows is None else FakeTable(rows)
+
+
+def _package():
+    return FakePackage(
+        {
+            "Directory": [
+                {"Directory": "TARGETDIR", "Directory_Parent": None, "DefaultDir": "SourceDir"},
+                {"Directory": "INSTALLDIR", "Directory_Parent": "TARGETDIR", "DefaultDir": "App"},
+            ],
+            "Component": [
+                {
+                    "Component": "Main",
+                    "ComponentId": None,
+                    "Directory_": "INSTALLDIR",
+                    "Attributes": 0,
+                    "Condition": None,
+                    "KeyPath": None,
+                }
+            ],
+            "File": [
+                {
+                    "File": "app.exe",
+                    "Component_": "Main",
+                    "FileName": "app.exe",
+                    "FileSize": 0,
+                    "Version": None,
+                    "Language": None,
+                    "Attributes": 0,
+                    "Sequence": 1,
+                }
+            ],
+            "Registry": [
+                {
+                    "Registry": "Reg",
+                    "Root": 2,
+                    "Key": "Software\\Example",
+                    "Name": None,
+                    "Value": None,
+                    "Component_": "Main",
+                }
+            ],
+            "Media": [
+                {
+                    "DiskId": 1,
+                    "LastSequence": 1,
+                    "DiskPrompt": None,
+                    "Cabinet": None,
+                    "VolumeLabel": None,
+                    "Source": None,
+                }
+            ],
+        }
+    )
+
+
+def test_lazy_msi_builds_only_the_collections_it_needs():
+    package = _package()
+    msi = Msi(package, lazy=True)
+    assert package.requested == []
+
+    registry = msi.registry_keys["Reg"]
+    assert package.requested == ["Registry", "Component", "Directory"]
+    assert registry.component.directory is msi.directories["INSTALLDIR"]
+    assert msi.components["Main"].files == {}
+
+    assert msi.root.id == "TARGETDIR"
+    file = msi.files["app.exe"]
+    assert package.requested[3:] == ["File", "Media"]
+    assert msi.components["Main"].files == {"app.exe": file}
+    assert file.media is msi.medias[1]
+
+
+def test_strict_link_failure_is_raised_on_every_access():
+    package = _package()
+    package.tables["Component"][0]["Directory_"] = "Missing"
+    msi = Msi(package, lazy=True)
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Directory_ refers to Directory 'Missing'"):
+            list(msi.components)
+    assert "components" not in msi.__dict__
+
+
+def test_eager_msi_builds_every_collection():
+    package = _package()
+    msi = Msi(package)
+
+    assert sorted(package.requested) == sorted(
+        ["Directory", "Component", "File", "Media", "Registry", "RemoveFile", "Shortcut", "Icon"]
+    )
+    assert msi.root is msi.directories["TARGETDIR"]
+    assert msi.components["Main"].registry_keys == {"Reg": msi.registry_keys["Reg"]}
+
+
+def test_entities_have_no_instance_dict_and_share_empty_children():
+    directory = _directory("TARGETDIR", None)
+    component = _component()
+
+    for entity in (directory, component, _file("a.txt", 1), _media(1, 1), _registry("R", "Main")):
+        assert not hasattr(entity, "__dict__")
+    assert directory.children is component.files
+    with pytest.raises(TypeError):
+        component.files["a.txt"] = None
+
+    component.directory = directory
+    directory._add_component(component)
+    assert directory.components == {"Main": component}
+    assert directory.children == {}
@@ -0,0 +1,248 @@
+import mmap
+import re
+import struct
+from pathlib import Path
+
+import pytest
+
+from pymsi import streamname
+from pymsi.column import Column
+from pymsi.package import Package
+from pymsi.stringpool import StringPool
+from pymsi.table import Table
+
+
+class FakeOle:
+    def __init__(self, streams, stream_type):
+        self.streams = streams
+        self.stream_type = stream_type
+        self.opened = []
+
+    def exists(self, name):
+        return name in self.streams
+
+    def openstream(self, name):
+        self.opened.append(name)
+        return self.stream_type(self.streams[name])
+
+
+def _string_pool(strings):
+    pool = struct.pack("<I", 1252)
+    data = b""
+    for s in strings:
+        pool += struct.pack("<HH", len(s), 1)
+        data += s.encode("cp1252")
+    return StringPool(pool, data)
+
+
+@pytest.fixture
+def package_with_tables(sized_bytes_io):
+    def build(tables, streams=None, strings=()):
+        package = Package.__new__(Package)
+        package.tables = {table.name: table for table in tables}
+        package.ole = FakeOle(streams or {}, sized_bytes_io)
+        package.string_pool = _string_pool(strings)
+        package._join_indexes = {}
+        package._validation_loaded = True
+        return package
+
+    return build
+
+
+def _component_tables():
+    component = Table(
+        "Component",
+        [
+            Column("Component").mark_primary_key().string(72),
+            Column("Directory_").mark_foreign_key("Directory", 1).string(72),
+        ],
+    )
+    component.rows = [
+        {"Component": "Main", "Directory_": "INSTALLDIR"},
+        {"Component": "Docs", "Directory_": "INSTALLDIR"},
+    ]
+    file = Table(
+        "File",
+        [
+            Column("File").mark_primary_key().string(72),
+            Column("Component_").mark_foreign_key("Component", 1).string(72),
+        ],
+    )
+    file.rows = [
+        {"File": "app.exe", "Component_": "Main"},
+        {"File": "readme.txt", "Component_": "Docs"},
+        {"File": "app.dll", "Component_": "Main"},
+    ]
+    registry = Table(
+        "Registry",
+        [
+            Column("Registry").mark_primary_key().string(72),
+            Column("Component_").mark_foreign_key("Component", 1).string(72),
+        ],
+    )
+    registry.rows = [{"Registry": "Run", "Component_": "Main"}]
+    return [component, file, registry]
+
+
+def test_join_uses_validation_foreign_keys(package_with_tables):
+    package = package_with_tables(_component_tables())
+
+    assert [row["File"] for row in package.join("File", "Component", "Main")] == [
+        "app.exe",
+        "app.dll",
+    ]
+    assert [row["Registry"] for row in package.join("Registry", "Component", "Main")] == ["Run"]
+    assert package.join("Registry", "Component", "Docs") == []
+    assert ("File", ("Component_",)) in package._join_indexes
+
+
+def test_join_with_explicit_column_needs_no_validation_data(package_with_tables):
+    tables = _component_tables()
+    tables[1].columns[1].foreign_key_table = None
+    package = package_with_tables(tables)
+
+    with pytest.raises(ValueError, match="no foreign key"):
+        package.join("File", "Component", "Main")
+    assert len(package.join("File", "Component", "Main", column="Component_")) == 2
+    with pytest.raises(KeyError, match="Missing"):
+        package.join("File", "Component", "Main", column="Missing")
+
+
+def test_join_supports_composite_foreign_keys(package_with_tables):
+    control_event = Table(
+        "ControlEvent",
+        [
+            Column("Dialog_").mark_primary_key().mark_foreign_key("Control", 1).string(72),
+            Column("Control_").mark_primary_key().mark_foreign_key("Control", 2).string(50),
+            Column("Event").mark_primary_key().string(50),
+        ],
+    )
+    control_event.rows = [
+        {"Dialog_": "Welcome", "Control_": "Next", "Event": "NewDialog"},
+        {"Dialog_": "Welcome", "Control_": "Cancel", "Event": "SpawnDialog"},
+        {"Dialog_": "Exit", "Control_": "Next", "Event": "EndDialog"},
+    ]
+    package = package_with_tables([control_event])
+
+    rows = package.join("ControlEvent", "Control", "Welcome", "Next")
+    assert [row["Event"] for row in rows] == ["NewDialog"]
+    with pytest.raises(TypeError, match="Expected 2 key value"):
+        package.join("ControlEvent", "Control", "Welcome")
+
+
+def test_join_rejects_ambiguous_foreign_keys(package_with_tables):
+    shortcut = Table(
+        "Shortcut",
+        [
+            Column("Shortcut").mark_primary_key().string(72),
+            Column("Directory_").mark_foreign_key("Directory", 1).string(72),
+            Column("WkDir").mark_foreign_key("Directory", 1).string(72),
+        ],
+    )
+    shortcut.rows = []
+    package = package_with_tables([shortcut])
+
+    with pytest.raises(ValueError, match="pass column="):
+        package.join("Shortcut", "Directory", "INSTALLDIR")
+    assert package.join("Shortcut", "Directory", "INSTALLDIR", column="WkDir") == []
+
+
+def test_get_with_columns_returns_projection_and_reuses_read_columns(package_with_tables):
+    table = Table(
+        "File",
+        [
+            Column("File").mark_primary_key().string(72),
+            Column("Component_").string(72),
+            Column("FileSize").i32(),
+        ],
+    )
+    stream = struct.pack("<2H", 1, 2) + struct.pack("<2H", 3, 3)
+    stream += struct.pack("<2I", *((v ^ 0x8000_0000) for v in (10, 20)))
+    package = package_with_tables(
+        [table], {table.stream_name(): stream}, ["a.dll", "b.dll", "Main"]
+    )
+
+    projection = package.get("File", columns=["File", "FileSize"])
+    assert list(projection) == [
+        {"File": "a.dll", "FileSize": 10},
+        {"File": "b.dll", "FileSize": 20},
+    ]
+    assert package.get("File", columns=("FileSize",))[1] == {"FileSize": 20}
+    assert len(package.ole.opened) == 1
+
+    assert package.get("File")[0] == {"File": "a.dll", "Component_": "Main", "FileSize": 10}
+    assert len(package.ole.opened) == 2
+    assert package.get("Missing", columns=["File"]) is None
+
+
+def test_search_reports_matching_cells_by_primary_key(package_with_tables):
+    file = Table(
+        "File",
+        [
+            Column("File").mark_primary_key().string(72),
+            Column("FileName").string(255),
+            Column("FileSize").i32(),
+        ],
+    )
+    log = Table("Log", [Column("Message").string(255)])
+    strings = ["app.exe", "APP~1.EXE|app.exe", "lib.dll", "lib.dll|lib.dll", "started app"]
+    package = package_with_tables(
+        [file, log],
+        {
+            file.stream_name(): struct.pack("<4H", 1, 3, 2, 4) + struct.pack("<2I", 1, 2),
+            log.stream_name(): struct.pack("<H", 5),
+        },
+        strings,
+    )
+
+    assert package.search("app") == [
+        ("File", "File", "app.exe"),
+        ("File", "FileName", "app.exe"),
+        ("Log", "Message", 0),
+    ]
+    assert package.search(re.compile(r"\.dll$"), tables=["File"]) == [
+        ("File", "File", "lib.dll"),
+        ("File", "FileName", "lib.dll"),
+    ]
+    assert package.search("missing") == []
+    assert file.needs_read(["FileSize"])
+
+
+EXAMPLE_MSI = Path(__file__).resolve().parents[1] / "docs" / "_static" / "example.msi"
+
+
+@pytest.mark.skipif(not EXAMPLE_MSI.exists(), reason="example.msi not available")
+def test_lazy_package_loads_parts_on_first_use():
+    with Package(EXAMPLE_MSI, lazy=True) as package:
+        assert package._summary is None and package._string_pool is None
+        assert package.summary.author() == "Test"
+        assert package._string_pool is None and package._tables is None
+
+        assert package["Property"].lookup("ProductVersion")["Value"] == "1.0.0"
+        assert package._string_pool is not None
+        assert not package._validation_loaded
+
+        with Package(EXAMPLE_MSI) as eager:
+            assert eager._validation_loaded
+            assert list(eager["File"]) == list(package["File"])
+
+
+@pytest.mark.skipif(not EXAMPLE_MSI.exists(), reason="example.msi not available")
+def test_mmap_package_reads_the_same_tables_from_views():
+    with Package(EXAMPLE_MSI) as expected, Package(EXAMPLE_MSI, use_mmap=True) as package:
+        assert sorted(package.tables) == sorted(expected.tables)
+        for name in expected.tables:
+            assert list(package[name]) == list(expected[name])
+        assert isinstance(package.string_pool._data.obj, mmap.mmap)
+        assert package.summary.author() == "Test"
+
+
+@pytest.mark.skipif(not EXAMPLE_MSI.exists(), reason="example.msi not available")
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_stream_view_returns_stream_data_without_copying(use_mmap):
+    with Package(EXAMPLE_MSI, use_mmap=use_mmap) as package:
+        view = package.stream_view(streamname.encode_unicode("Sample.cab"))
+        assert isinstance(view, memoryview)
+        assert view[:4] == b"MSCF"
+        if use_mmap:
+            assert isinstance(view.obj, mmap.mmap)
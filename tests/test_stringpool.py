@@ -0,0 +1,97 @@
+import re
+import struct
+
+import pytest
+
+from pymsi.stringpool import StringPool
+
+
+def _pool(entries, codepage=1252):
+    """Build a pool from ``(raw bytes, refcount)`` entries."""
+    pool = struct.pack("<I", codepage)
+    for raw, refcount in entries:
+        if len(raw) > 0xFFFF:
+            pool += struct.pack("<HHI", 0, refcount, len(raw))
+        else:
+            pool += struct.pack("<HH", len(raw), refcount)
+    data = b"".join(raw for raw, _refcount in entries)
+    return StringPool(pool, data)
+
+
+def test_strings_are_decoded_on_first_access():
+    pool = _pool([(b"Alpha", 1), (b"", 0), (b"Caf\xe9", 3)])
+
+    assert len(pool) == 3
+    assert pool._num_undecoded == 3
+    assert pool[2] == "Café"
+    assert pool._num_undecoded == 2
+    assert pool.resolve(0) is None
+    assert pool.resolve_all([1, 3, 1, 0]) == ["Alpha", "Café", "Alpha", None]
+    assert pool.refcount(2) == 3
+    assert pool.strings == [("Alpha", 1), ("", 0), ("Café", 3)]
+    with pytest.raises(IndexError):
+        pool[3]
+    with pytest.raises(IndexError):
+        pool.resolve_all([4])
+
+
+def test_long_strings_use_a_32_bit_length():
+    long_string = b"x" * 0x10001
+    pool = _pool([(b"a", 1), (long_string, 2), (b"", 0), (b"b", 1)])
+
+    assert len(pool) == 4
+    assert pool.resolve_all([1, 2, 3, 4]) == ["a", long_string.decode(), "", "b"]
+    assert pool.refcount(1) == 2
+
+
+def test_codepage_zero_falls_back_per_string():
+    pool = _pool([(b"plain", 1), ("naïve".encode("utf-8"), 1), (b"caf\xe9", 1)], codepage=0)
+
+    assert pool.resolve_all([1, 2, 3]) == ["plain", "naïve", "café"]
+
+
+def test_bulk_decoding_matches_single_lookups():
+    entries = [(f"Value{n}\xe9".encode("cp1252"), 1) for n in range(64)]
+    entries.append((b"\x81", 1))  # undefined in cp1252, so only this string fails
+
+    bulk = _pool(entries)
+    assert bulk.resolve_all(range(1, 65)) == [_pool(entries).resolve(n) for n in range(1, 65)]
+    with pytest.raises(UnicodeDecodeError):
+        bulk.resolve(65)
+
+
+def test_find_and_search_return_raw_references():
+    pool = _pool([(b"ProductName", 1), (b"Hello.exe", 2), (b"hello.dll", 1), (b"Hello.exe", 1)])
+
+    assert pool.find("Hello.exe") == [2, 4]
+    assert pool.find("missing") == []
+    assert pool.search("Hello") == [2, 4]
+    assert pool.search(re.compile(r"hello\.(exe|dll)", re.IGNORECASE)) == [2, 3, 4]
+    with pytest.raises(TypeError):
+        pool.search(b"Hello")
+
+
+def test_find_decodes_only_matching_entries():
+    entries = [(f"Name{n}".encode(), 1) for n in range(100)]
+    entries += [(b"aa", 1), (b"", 0), (b"a", 1), (b"Caf\xe9", 1), (b"Name7", 1)]
+    pool = _pool(entries)
+
+    assert pool.find("Name7") == [8, 105]
+    assert pool.find("a") == [103]
+    assert pool.find("aaa") == []
+    assert pool.find("Café") == [104]
+    assert pool.find("") == [102]
+    assert pool.find("ame7") == []
+    assert pool.find("\u20ac\u4e00") == []
+    assert pool._num_undecoded == len(entries) - 5
+
+    neutral = _pool([("Café".encode("utf-8"), 1), ("Café".encode("cp1252"), 1)], codepage=0)
+    assert neutral.find("Café") == [1, 2]
+
+
+def test_pool_reads_streams_and_buffers_alike(sized_bytes_io):
+    pool = struct.pack("<IHHHH", 1252, 5, 1, 4, 2)
+    data = b"AlphaCaf\xe9"
+    from_streams = StringPool(sized_bytes_io(pool), sized_bytes_io(data))
+
+    assert from_streams.strings == StringPool(pool, data).strings == [("Alpha", 1), ("Café", 2)]
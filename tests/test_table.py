@@ -0,0 +1,445 @@
+import io
+import struct
+
+import pytest
+
+from pymsi.column import Column
+from pymsi.reader import BinaryReader
+from pymsi.stringpool import StringPool
+from pymsi.table import Table
+
+
+class _FakeStream:
+    """Minimal stream satisfying BinaryReader's interface (mirrors OleStream)."""
+
+    def __init__(self, data: bytes):
+        self._bio = io.BytesIO(data)
+        self.size = len(data)
+
+    def read(self, n=-1):
+        return self._bio.read(n)
+
+    def tell(self):
+        return self._bio.tell()
+
+    def seek(self, pos):
+        self._bio.seek(pos)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._bio.close()
+
+
+def _make_string_pool(strings, long_refs: bool):
+    codepage = 1252 | (0x8000_0000 if long_refs else 0)
+    pool = struct.pack("<I", codepage)
+    data = b""
+    for s in strings:
+        raw = s.encode("cp1252")
+        pool += struct.pack("<HH", len(raw), 1)
+        data += raw
+    return StringPool(_FakeStream(pool), _FakeStream(data))
+
+
+def _file_table():
+    return Table(
+        "File",
+        [
+            Column("File").mark_primary_key().string(72),
+            Column("FileSize").i32(),
+            Column("Language").mark_nullable().string(20),
+            Column("Attributes").mark_nullable().i16(),
+        ],
+    )
+
+
+def _str_refs(refs, long_refs):
+    width = 3 if long_refs else 2
+    return b"".join(ref.to_bytes(width, "little") for ref in refs)
+
+
+def _file_stream(long_refs):
+    # Column-major layout: all File refs, all FileSize values, and so on.
+    return (
+        _str_refs([1, 2, 3], long_refs)
+        + struct.pack("<3I", *((v ^ 0x8000_0000) for v in (16376, 0, 0x7FFF_FFFF)))
+        + _str_refs([4, 0, 4], long_refs)
+        + struct.pack("<3H", 512 ^ 0x8000, 0, 0x7FFF ^ 0x8000)
+    )
+
+
+@pytest.mark.parametrize("long_refs", [False, True])
+def test_read_rows_decodes_column_major_stream(long_refs):
+    pool = _make_string_pool(["a.dll", "b.dll", "c.dll", "1033"], long_refs)
+    data = _file_stream(long_refs)
+
+    rows = _file_table()._read_rows(BinaryReader(_FakeStream(data)), pool)
+
+    assert rows == [
+        {"File": "a.dll", "FileSize": 16376, "Language": "1033", "Attributes": 512},
+        {"File": "b.dll", "FileSize": 0, "Language": None, "Attributes": None},
+        {"File": "c.dll", "FileSize": 0x7FFF_FFFF, "Language": "1033", "Attributes": 0x7FFF},
+    ]
+
+
+def test_read_cells_widens_long_string_refs():
+    column = Column("Name").string(72)
+    data = memoryview(b"\x01\x00\x00\xff\xff\x01\x02\x00\x03")
+
+    assert list(column.read_cells(data, long_string_refs=True)) == [1, 0x1FFFF, 0x30002]
+
+
+def test_read_rows_rejects_out_of_range_string_refs():
+    pool = _make_string_pool(["only"], long_refs=False)
+    table = Table("Strings", [Column("Name").string(32)])
+
+    with pytest.raises(IndexError):
+        table._read_rows(BinaryReader(_FakeStream(struct.pack("<H", 2))), pool)
+
+
+def _read_file_table(long_refs=False):
+    pool = _make_string_pool(["a.dll", "b.dll", "c.dll", "1033"], long_refs)
+    table = _file_table()
+    table.read_rows(BinaryReader(_FakeStream(_file_stream(long_refs))), pool)
+    return table
+
+
+def test_read_rows_keeps_columnar_cells_and_builds_rows_on_access():
+    table = _read_file_table()
+
+    assert len(table) == 3
+    assert [cells.itemsize for cells in table._cells] == [2, 4, 2, 2]
+    row = table[1]
+    assert row == {"File": "b.dll", "FileSize": 0, "Language": None, "Attributes": None}
+    assert row["File"] == "b.dll"
+    assert row.get("Missing") is None
+    assert "Language" in row and "Missing" not in row
+    assert list(row) == ["File", "FileSize", "Language", "Attributes"]
+    assert table[-1]["File"] == "c.dll"
+    assert [r["File"] for r in table[0:2]] == ["a.dll", "b.dll"]
+    assert [r["File"] for r in table] == ["a.dll", "b.dll", "c.dll"]
+    assert table.rows == list(table)
+    with pytest.raises(IndexError):
+        table[3]
+
+
+def test_iter_localize_matches_row_access():
+    pool = _make_string_pool(["KEY", "short|Long Name"], long_refs=False)
+    table = Table(
+        "Directory",
+        [Column("Directory").mark_primary_key().string(72), Column("DefaultDir", 0x1FFF)],
+    )
+    table.read_rows(BinaryReader(_FakeStream(struct.pack("<2H", 1, 2))), pool)
+
+    assert table.columns[1].localizable
+    assert table[0]["DefaultDir"] == "short|Long Name"
+    assert table.get(0, localize=True)["DefaultDir"] == "Long Name"
+    assert list(table.iter(localize=True)) == [{"Directory": "KEY", "DefaultDir": "Long Name"}]
+
+
+def test_assigned_rows_are_returned_unchanged():
+    table = _file_table()
+    row = {"File": "a.dll", "FileSize": 1, "Language": None, "Attributes": None}
+    table.rows = [row]
+
+    assert next(iter(table)) is row
+    assert table[0] is row
+    assert len(table) == 1
+
+
+def test_unread_table_raises():
+    table = _file_table()
+
+    with pytest.raises(ValueError, match="not read yet"):
+        len(table)
+    with pytest.raises(ValueError, match="not read yet"):
+        table[0]
+
+
+def test_lookup_uses_primary_key_index():
+    table = _read_file_table(long_refs=True)
+
+    assert table.lookup("b.dll") == table[1]
+    assert table.lookup("missing.dll") is None
+    assert table.contains("c.dll")
+    assert not table.contains("missing.dll")
+    with pytest.raises(TypeError, match="1 primary-key column"):
+        table.lookup("a.dll", 1)
+
+
+def test_lookup_supports_composite_keys_and_keeps_first_duplicate():
+    pool = _make_string_pool(["File", "Registry"], long_refs=False)
+    table = Table(
+        "_Columns",
+        [
+            Column("Table").mark_primary_key().string(64),
+            Column("Number").mark_primary_key().i16(),
+            Column("Type").i16(),
+        ],
+    )
+    stream = struct.pack("<3H", 1, 2, 1) + struct.pack("<3H", *(n ^ 0x8000 for n in (1, 1, 1)))
+    stream += struct.pack("<3H", *(n ^ 0x8000 for n in (10, 20, 30)))
+    table.read_rows(BinaryReader(_FakeStream(stream)), pool)
+
+    assert table.lookup("Registry", 1)["Type"] == 20
+    assert table.lookup("File", 1)["Type"] == 10
+    assert table.contains("File", 1)
+    assert not table.contains("File", 2)
+
+
+def test_lookup_requires_primary_key_columns():
+    table = Table("NoKey", [Column("Value").i16()])
+    table.rows = []
+
+    with pytest.raises(ValueError, match="no primary-key columns"):
+        table.lookup(1)
+
+
+class _CountingStream(_FakeStream):
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, n=-1):
+        data = super().read(n)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_read_rows_with_columns_skips_unrequested_columns():
+    pool = _make_string_pool(["a.dll", "b.dll", "c.dll", "1033"], long_refs=True)
+    stream = _CountingStream(_file_stream(long_refs=True))
+    table = _file_table()
+
+    table.read_rows(BinaryReader(stream), pool, columns=["File", "Attributes"])
+
+    assert stream.bytes_read == 3 * 3 + 3 * 2
+    assert table.needs_read()
+    assert not table.needs_read(["Attributes", "File"])
+    assert table.rows is None
+    projection = table.select("Attributes", "File")
+    assert [column.name for column in projection.columns] == ["Attributes", "File"]
+    assert list(projection) == [
+        {"Attributes": 512, "File": "a.dll"},
+        {"Attributes": None, "File": "b.dll"},
+        {"Attributes": 0x7FFF, "File": "c.dll"},
+    ]
+    assert projection.lookup("b.dll") == {"Attributes": None, "File": "b.dll"}
+    with pytest.raises(ValueError, match="not read yet"):
+        table.select("FileSize")
+    with pytest.raises(KeyError, match="Missing"):
+        table.needs_read(["Missing"])
+
+    stream.seek(0)
+    table.read_rows(BinaryReader(stream), pool)
+    assert not table.needs_read()
+    assert table[2]["FileSize"] == 0x7FFF_FFFF
+
+
+class _ViewStream(_CountingStream):
+    """Stream handing out views of its data, like pymsi.cfb.CompoundStream."""
+
+    def read_view(self, size=-1):
+        return memoryview(self.read(size))
+
+
+def _bound_file_table(long_refs=False, stream_type=_ViewStream):
+    pool = _make_string_pool(["a.dll", "b.dll", "c.dll", "1033"], long_refs)
+    data = _file_stream(long_refs)
+    streams = []
+
+    def open_stream():
+        streams.append(stream_type(data))
+        return streams[-1]
+
+    table = _file_table()
+    table.bind(pool, len(data), open_stream)
+    return table, streams
+
+
+@pytest.mark.parametrize("long_refs", [False, True])
+def test_bound_table_counts_and_fetches_rows_without_reading(long_refs):
+    table, streams = _bound_file_table(long_refs)
+
+    assert len(table) == 3
+    assert table.rows is None
+    assert not streams
+
+    row = table.row_at(2)
+    assert row == {
+        "File": "c.dll",
+        "FileSize": 0x7FFF_FFFF,
+        "Language": "1033",
+        "Attributes": 0x7FFF,
+    }
+    assert table.row_at(-2)["File"] == "b.dll"
+    assert len(streams) == 1
+    assert table.rows is None
+    with pytest.raises(IndexError):
+        table.row_at(3)
+
+
+def test_row_at_uses_already_read_columns():
+    table, streams = _bound_file_table()
+    pool = table._string_pool
+    table.read_rows(BinaryReader(_FakeStream(_file_stream(False))), pool, columns=["File"])
+
+    assert table.row_at(0)["File"] == "a.dll"
+    assert len(streams) == 1
+
+
+def test_row_at_opens_the_bound_stream_once():
+    table, streams = _bound_file_table()
+
+    assert [table.row_at(row)["File"] for row in range(len(table))] == ["a.dll", "b.dll", "c.dll"]
+    assert table.row_at(1)["FileSize"] == 0
+    assert len(streams) == 1
+    assert streams[0].bytes_read == len(_file_stream(False))
+
+
+def test_row_at_reads_streams_that_cannot_be_viewed_into_cells():
+    table, streams = _bound_file_table(stream_type=_CountingStream)
+
+    assert table.row_at(1)["FileSize"] == 0
+    assert table.row_at(2)["File"] == "c.dll"
+    assert len(streams) == 1
+    assert not table.needs_read()
+    assert table._view is None
+
+
+def test_stream_view_is_dropped_once_every_column_is_read():
+    table, streams = _bound_file_table()
+    assert table.row_at(0)["File"] == "a.dll"
+    assert table._view is not None
+
+    table.read_rows(BinaryReader(_FakeStream(_file_stream(False))), table._string_pool)
+    assert table._view is None
+    assert table.row_at(2)["File"] == "c.dll"
+    assert len(streams) == 1
+
+
+def test_row_at_on_partly_read_unbound_table_raises_value_error():
+    pool = _make_string_pool(["a.dll", "b.dll", "c.dll", "1033"], long_refs=False)
+    table = _file_table()
+    table.read_rows(BinaryReader(_FakeStream(_file_stream(False))), pool, columns=["File"])
+
+    with pytest.raises(ValueError, match="not bound"):
+        table.row_at(0)
+
+
+def test_bound_table_without_stream_is_empty():
+    table = _file_table()
+    table.bind(_make_string_pool([], long_refs=False), 0, None)
+
+    assert len(table) == 0
+    with pytest.raises(IndexError):
+        table.row_at(0)
+
+
+def test_binary_search_lookup_decodes_only_the_searched_keys():
+    names = [f"file{n:03}" for n in range(100)]
+    pool = _make_string_pool(names, long_refs=False)
+    table = Table("File", [Column("File").mark_primary_key().string(72), Column("Size").i32()])
+    data = struct.pack("<100H", *range(1, 101))
+    data += struct.pack("<100I", *((n ^ 0x8000_0000) for n in range(100)))
+    table.bind(pool, len(data), lambda: _FakeStream(data))
+
+    assert table.lookup("file042", binary_search=True) == {"File": "file042", "Size": 42}
+    assert table.contains("file099", binary_search=True)
+    assert not table.contains("missing", binary_search=True)
+    assert not table.contains("file0", binary_search=True)
+    assert table._key_index is None
+    assert pool._num_undecoded == 98
+
+
+def test_binary_search_lookup_supports_composite_and_integer_keys():
+    pool = _make_string_pool(["File", "Registry"], long_refs=True)
+    table = Table(
+        "_Columns",
+        [
+            Column("Table").mark_primary_key().string(64),
+            Column("Number").mark_primary_key().i16(),
+            Column("Name").string(64),
+        ],
+    )
+    data = _str_refs([1, 1, 2], True) + struct.pack("<3H", *(n ^ 0x8000 for n in (1, 2, 1)))
+    data += _str_refs([1, 2, 2], True)
+    table.bind(pool, len(data), lambda: _FakeStream(data))
+
+    assert table.lookup("File", 2, binary_search=True) == {
+        "Table": "File",
+        "Number": 2,
+        "Name": "Registry",
+    }
+    assert table.lookup("Registry", 1, binary_search=True)["Name"] == "Registry"
+    assert table.lookup("Registry", 2, binary_search=True) is None
+    assert table.lookup("File", 0x8000, binary_search=True) is None
+    with pytest.raises(TypeError, match="2 primary-key column"):
+        table.lookup("File", binary_search=True)
+
+
+def test_binary_search_lookup_falls_back_when_rows_are_not_sorted():
+    pool = _make_string_pool(["a", "b", "c", "d", "e"], long_refs=False)
+    table = Table("Property", [Column("Property").mark_primary_key().string(72)])
+    data = struct.pack("<5H", 5, 4, 3, 2, 1)
+    table.bind(pool, len(data), lambda: _FakeStream(data))
+
+    assert table.lookup("a", binary_search=True) == {"Property": "a"}
+    assert table.lookup("e", binary_search=True) == {"Property": "e"}
+    # The fallback indexes the key column without reading the other columns.
+    assert table._key_index is not None
+
+
+def test_binary_search_checks_the_order_of_every_row():
+    pool = _make_string_pool(["a", "b", "c"], long_refs=False)
+    table = Table("Property", [Column("Property").mark_primary_key().string(72)])
+    data = struct.pack("<3H", 1, 3, 2)
+    table.bind(pool, len(data), lambda: _FakeStream(data))
+
+    # Bisecting rows 1 and 0 would see "c" then "a", which looks sorted.
+    assert table.contains("b", binary_search=True)
+    assert table.lookup("b", binary_search=True) == table.lookup("b") == {"Property": "b"}
+
+
+def test_binary_search_tries_every_copy_of_a_duplicated_string():
+    pool = _make_string_pool(["a", "b", "a"], long_refs=False)
+    table = Table("Property", [Column("Property").mark_primary_key().string(72)])
+    data = struct.pack("<2H", 2, 3)
+    table.bind(pool, len(data), lambda: _FakeStream(data))
+
+    assert table.lookup("a", binary_search=True) == {"Property": "a"}
+    assert table._key_index is None
+
+
+def test_lookup_on_bound_table_reads_only_key_columns():
+    table, streams = _bound_file_table()
+
+    assert table.lookup("b.dll")["FileSize"] == 0
+    assert table.rows is None
+    assert streams[0].bytes_read == 3 * 2
+
+
+@pytest.mark.parametrize("stringrefs", [{1, 4}, set(range(1, 20)) - {2, 3}])
+def test_find_string_refs_scans_raw_cells(stringrefs):
+    table, streams = _bound_file_table()
+
+    assert table.find_string_refs(stringrefs) == [(0, "File"), (0, "Language"), (2, "Language")]
+    assert table.key_at(2) == "c.dll"
+    # Only the two string columns are read.
+    assert streams[0].bytes_read == 2 * 3 * 2
+    assert table.find_string_refs({0x10000}) == []
+
+
+def test_column_values_reads_only_that_column():
+    table, streams = _bound_file_table()
+
+    assert table.column_values("Language") == ["1033", None, "1033"]
+    assert table.needs_read() and not table.needs_read(["Language"])
+    assert streams[0].bytes_read == 3 * 2
+    with pytest.raises(KeyError, match="Missing"):
+        table.column_values("Missing")
+
+    table.rows = [{"File": "a.dll"}, {"File": "b.dll"}]
+    assert table.column_values("File") == ["a.dll", "b.dll"]